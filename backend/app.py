@@ -1,68 +1,111 @@
 from __future__ import annotations
 
+import asyncio
 import csv
+import functools
 import io
-import json
 import mimetypes
+import mmap
+import multiprocessing
 import re
+import sqlite3
+import time
 import uuid
-from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Iterator
 
+import aiofiles
+import anyio.to_thread
+import orjson
 from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 try:
     from config import (
         CORS_ORIGINS,
         DB_PATH,
+        LLM_CACHE_MAX_BYTES,
+        LLM_CACHE_MAX_ENTRIES,
+        LLM_CACHE_TTL_DAYS,
         MAX_UPLOAD_BYTES,
         OLLAMA_BASE_URL,
+        OLLAMA_KEEP_ALIVE,
         OLLAMA_MODEL,
+        OLLAMA_NUM_CTX,
         OLLAMA_VISION_MODEL,
+        PARSE_INLINE_MAX_BYTES,
+        PARSE_PROCESS_WORKERS,
         SUPPORTED_EXTENSIONS,
+        THREADPOOL_WORKERS,
         UPLOAD_DIR,
     )
     from database import Database
     from services.document_parser import (
         build_preview,
         chunk_text,
+        content_hasher,
+        mark_pool_worker,
         parse_document,
-        sha256_bytes,
+        shutdown_pdf_page_pool,
     )
     from services.intelligence import (
-        analyze_document,
-        compare_documents,
-        summarize_document,
+        analyze_document_async,
+        compare_documents_async,
+        prompt_templates,
+        summarize_document_async,
     )
+    from services.llm_cache import LLMCache, decode_json, encode_json, text_digest
     from services.ollama_client import OllamaClient, OllamaConfig
+    from services.uring_writer import uring_available, write_and_sync
 except ModuleNotFoundError:
     from backend.config import (
         CORS_ORIGINS,
         DB_PATH,
+        LLM_CACHE_MAX_BYTES,
+        LLM_CACHE_MAX_ENTRIES,
+        LLM_CACHE_TTL_DAYS,
         MAX_UPLOAD_BYTES,
         OLLAMA_BASE_URL,
+        OLLAMA_KEEP_ALIVE,
         OLLAMA_MODEL,
+        OLLAMA_NUM_CTX,
         OLLAMA_VISION_MODEL,
+        PARSE_INLINE_MAX_BYTES,
+        PARSE_PROCESS_WORKERS,
         SUPPORTED_EXTENSIONS,
+        THREADPOOL_WORKERS,
         UPLOAD_DIR,
     )
     from backend.database import Database
     from backend.services.document_parser import (
         build_preview,
         chunk_text,
+        content_hasher,
+        mark_pool_worker,
         parse_document,
-        sha256_bytes,
+        shutdown_pdf_page_pool,
     )
     from backend.services.intelligence import (
-        analyze_document,
-        compare_documents,
-        summarize_document,
+        analyze_document_async,
+        compare_documents_async,
+        prompt_templates,
+        summarize_document_async,
+    )
+    from backend.services.llm_cache import (
+        LLMCache,
+        decode_json,
+        encode_json,
+        text_digest,
     )
     from backend.services.ollama_client import OllamaClient, OllamaConfig
+    from backend.services.uring_writer import uring_available, write_and_sync
 
 
 class CompareRequest(BaseModel):
@@ -75,10 +118,44 @@ class ExportRequest(BaseModel):
     format: str = Field(default="json")
 
 
+class ORJSONResponse(JSONResponse):
+    # Local equivalent of fastapi.responses.ORJSONResponse, which newer
+    # FastAPI releases deprecate.
+    def render(self, content: Any) -> bytes:
+        return encode_json(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Handlers offload SQLite, file and Ollama work to threads; size both the
+    # asyncio default executor and Starlette's anyio pool so they don't cap
+    # the number of in-flight requests.
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(
+        max_workers=THREADPOOL_WORKERS, thread_name_prefix="doc-intel"
+    )
+    loop.set_default_executor(executor)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_WORKERS
+    await asyncio.to_thread(llm_cache.prune)
+    global parse_pool
+    parse_pool = new_parse_pool()
+    try:
+        yield
+    finally:
+        executor.shutdown(wait=False)
+        pool, parse_pool = parse_pool, None
+        pool.shutdown(wait=False, cancel_futures=True)
+        shutdown_pdf_page_pool()
+        await ollama.aclose()
+        db.close()
+
+
 app = FastAPI(
     title="Smart Document Intelligence Platform",
     version="2.0.0",
     description="Local-first document intelligence with FastAPI + Ollama + SQLite",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -89,15 +166,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-db = Database(DB_PATH)
+# One pooled reader per worker thread, so busy periods don't open and close
+# overflow connections.
+db = Database(DB_PATH, reader_pool_size=THREADPOOL_WORKERS)
 db.init_schema()
 ollama = OllamaClient(
     OllamaConfig(
-        base_url=OLLAMA_BASE_URL, model=OLLAMA_MODEL, vision_model=OLLAMA_VISION_MODEL
+        base_url=OLLAMA_BASE_URL,
+        model=OLLAMA_MODEL,
+        vision_model=OLLAMA_VISION_MODEL,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        num_ctx=OLLAMA_NUM_CTX,
     )
 )
+llm_cache = LLMCache(
+    db,
+    max_bytes=LLM_CACHE_MAX_BYTES,
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttl=timedelta(days=LLM_CACHE_TTL_DAYS),
+    version=text_digest(OLLAMA_MODEL, OLLAMA_VISION_MODEL, *prompt_templates())[:16],
+)
+# Created per lifespan so the app can be started again after a shutdown.
+parse_pool: ProcessPoolExecutor | None = None
 
 
+def new_parse_pool() -> ProcessPoolExecutor:
+    # forkserver children import only the parser module, never this app or
+    # its open SQLite connections and worker threads.
+    return ProcessPoolExecutor(
+        max_workers=PARSE_PROCESS_WORKERS,
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=mark_pool_worker,
+    )
+
+
+def model_succeeded(result: dict[str, Any]) -> bool:
+    return bool(result.get("model"))
+
+
+cached_analyze_document = llm_cache.cached(
+    "auto_extract",
+    key_parts=lambda kwargs: (
+        kwargs["filename"],
+        kwargs["text"],
+        *(kwargs.get("image_bytes") or []),
+    ),
+    cacheable=model_succeeded,
+)(analyze_document_async)
+cached_summarize_document = llm_cache.cached(
+    "summary",
+    key_parts=lambda kwargs: (kwargs["text"],),
+    level=lambda kwargs: kwargs["level"],
+    cacheable=model_succeeded,
+)(summarize_document_async)
+cached_compare_documents = llm_cache.cached(
+    "comparison",
+    key_parts=lambda kwargs: (
+        kwargs["left_name"],
+        kwargs["left_text"],
+        kwargs["right_name"],
+        kwargs["right_text"],
+    ),
+    cacheable=model_succeeded,
+)(compare_documents_async)
+
+
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+_SLUG_RE = re.compile(r"[^a-z0-9_-]+")
+_BASE_RE = re.compile(r"[^a-z0-9]+")
+
 MEDIA_TYPES = {
     "pdf": "application/pdf",
     "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
@@ -112,22 +250,28 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+@functools.lru_cache(maxsize=1024)
 def clean_version_group(value: str | None, filename: str) -> str:
     if value:
-        normalized = re.sub(r"[^a-z0-9_-]+", "-", value.lower()).strip("-")
+        normalized = _SLUG_RE.sub("-", value.lower()).strip("-")
         if normalized:
             return normalized
     base = Path(filename).stem.lower()
-    base = re.sub(r"[^a-z0-9]+", "-", base).strip("-")
+    base = _BASE_RE.sub("-", base).strip("-")
     return base or "document"
 
 
+@functools.lru_cache(maxsize=256)
+def _guess_media(filename: str, file_type: str) -> str | None:
+    return MEDIA_TYPES.get(file_type) or mimetypes.guess_type(filename)[0]
+
+
 def parse_json_field(raw: str | None, fallback: Any) -> Any:
-    if raw is None:
+    if not raw:
         return fallback
     try:
-        return json.loads(raw)
-    except Exception:
+        return decode_json(raw)
+    except orjson.JSONDecodeError:
         return fallback
 
 
@@ -160,6 +304,55 @@ def latest_analysis(document_id: str, analysis_type: str) -> dict[str, Any] | No
     }
 
 
+def latest_analyses_bulk(
+    document_ids: list[str], analysis_type: str
+) -> dict[str, dict[str, Any]]:
+    if not document_ids:
+        return {}
+    placeholders = ",".join("?" for _ in document_ids)
+    records = db.fetch_all(
+        f"""
+        SELECT document_id, result_json, level, created_at
+        FROM (
+            SELECT
+                document_id,
+                result_json,
+                level,
+                created_at,
+                ROW_NUMBER() OVER (
+                    PARTITION BY document_id ORDER BY created_at DESC
+                ) AS rn
+            FROM document_analyses
+            WHERE analysis_type = ? AND document_id IN ({placeholders})
+        )
+        WHERE rn = 1
+        """,
+        (analysis_type, *document_ids),
+    )
+    return {
+        record["document_id"]: {
+            "result": parse_json_field(record.get("result_json"), {}),
+            "level": record.get("level", ""),
+            "created_at": record.get("created_at", ""),
+        }
+        for record in records
+    }
+
+
+def summary_brief_of(result: Any) -> str:
+    if isinstance(result, dict):
+        return str(result.get("summary_brief") or "")
+    return ""
+
+
+def summary_briefs(document_ids: list[str]) -> dict[str, str]:
+    latest = latest_analyses_bulk(document_ids, "auto_extract")
+    return {
+        document_id: summary_brief_of(record["result"])
+        for document_id, record in latest.items()
+    }
+
+
 def list_entities(document_id: str) -> list[dict[str, Any]]:
     rows = db.fetch_all(
         """
@@ -173,36 +366,56 @@ def list_entities(document_id: str) -> list[dict[str, Any]]:
     return rows
 
 
-def save_analysis(
-    document_id: str, analysis_type: str, level: str, result: dict[str, Any]
+def insert_analysis(
+    conn: sqlite3.Connection,
+    document_id: str,
+    analysis_type: str,
+    level: str,
+    result: dict[str, Any],
 ) -> None:
-    db.execute(
+    conn.execute(
         """
         INSERT INTO document_analyses(document_id, analysis_type, level, result_json, created_at)
         VALUES (?, ?, ?, ?, ?)
         """,
-        (document_id, analysis_type, level, json.dumps(result), now_iso()),
+        (
+            document_id,
+            analysis_type,
+            level,
+            encode_json(result).decode("utf-8"),
+            now_iso(),
+        ),
     )
 
 
-def replace_entities(document_id: str, entities: list[dict[str, Any]]) -> None:
-    db.execute("DELETE FROM document_entities WHERE document_id = ?", (document_id,))
-    payload: list[tuple[Any, ...]] = []
-    for entity in entities:
-        payload.append(
-            (
-                document_id,
-                str(entity.get("entity_type") or "unknown"),
-                str(entity.get("value") or ""),
-                float(entity.get("confidence", 0.0) or 0.0),
-                str(entity.get("snippet") or ""),
-                entity.get("start_index"),
-                entity.get("end_index"),
-                now_iso(),
-            )
+def save_analysis(
+    document_id: str, analysis_type: str, level: str, result: dict[str, Any]
+) -> None:
+    db.write_batch(
+        lambda conn: insert_analysis(conn, document_id, analysis_type, level, result)
+    )
+
+
+def replace_entities(
+    conn: sqlite3.Connection, document_id: str, entities: list[dict[str, Any]]
+) -> None:
+    now = now_iso()
+    payload = [
+        (
+            document_id,
+            str(entity.get("entity_type") or "unknown"),
+            str(entity.get("value") or ""),
+            float(entity.get("confidence", 0.0) or 0.0),
+            str(entity.get("snippet") or ""),
+            entity.get("start_index"),
+            entity.get("end_index"),
+            now,
         )
+        for entity in entities
+    ]
 
-    db.executemany(
+    conn.execute("DELETE FROM document_entities WHERE document_id = ?", (document_id,))
+    conn.executemany(
         """
         INSERT INTO document_entities(
             document_id,
@@ -219,54 +432,118 @@ def replace_entities(document_id: str, entities: list[dict[str, Any]]) -> None:
     )
 
 
-def store_chunks(document_id: str, text: str) -> None:
-    db.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
-    chunks = chunk_text(text)
+def store_chunks(conn: sqlite3.Connection, document_id: str, chunks: list[str]) -> None:
     payload = [(document_id, index, chunk) for index, chunk in enumerate(chunks)]
-    db.executemany(
+    conn.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
+    conn.executemany(
         "INSERT INTO document_chunks(document_id, chunk_index, content) VALUES (?, ?, ?)",
         payload,
     )
 
 
-def format_document_row(row: dict[str, Any]) -> dict[str, Any]:
-    auto_extract = latest_analysis(row["id"], "auto_extract")
-    summary_brief = ""
-    if auto_extract and isinstance(auto_extract["result"], dict):
-        summary_brief = str(auto_extract["result"].get("summary_brief") or "")
+def allocate_version(conn: sqlite3.Connection, group: str) -> int:
+    row = conn.execute(
+        """
+        INSERT INTO version_counters(version_group, next_version) VALUES (?, 1)
+        ON CONFLICT(version_group) DO UPDATE SET next_version = next_version + 1
+        RETURNING next_version
+        """,
+        (group,),
+    ).fetchone()
+    return int(row["next_version"])
+
+
+@dataclass(slots=True, frozen=True)
+class DocumentRow:
+    id: str
+    filename: str
+    file_type: str
+    file_size: int
+    uploaded_at: str
+    preview_text: str
+    version_group: str
+    version_number: int
+    analysis_status: str
+    summary_brief: str
+
+
+def format_document_row(
+    row: dict[str, Any], brief_map: dict[str, str] | None = None
+) -> DocumentRow:
+    if brief_map is None:
+        auto_extract = latest_analysis(row["id"], "auto_extract")
+        summary_brief = summary_brief_of(
+            auto_extract["result"] if auto_extract else None
+        )
+    else:
+        summary_brief = brief_map.get(row["id"], "")
+
+    return DocumentRow(
+        id=row["id"],
+        filename=row["filename"],
+        file_type=row["file_type"],
+        file_size=row["file_size"],
+        uploaded_at=row["uploaded_at"],
+        preview_text=row["preview_text"],
+        version_group=row["version_group"],
+        version_number=row["version_number"],
+        analysis_status=row["analysis_status"],
+        summary_brief=summary_brief,
+    )
+
+
+def format_document_rows(rows: list[dict[str, Any]]) -> list[DocumentRow]:
+    brief_map = summary_briefs([row["id"] for row in rows])
+    return [format_document_row(row, brief_map) for row in rows]
+
+
+def read_image_bytes(document_row: dict[str, Any]) -> list[mmap.mmap] | None:
+    # Read-only mappings avoid copying the file into a Python bytes object;
+    # hashing and base64 encoding both accept any buffer. Callers close them.
+    if document_row["file_type"] not in {"png", "jpg", "jpeg"}:
+        return None
+    try:
+        with open(document_row["file_path"], "rb") as handle:
+            return [mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)]
+    except (OSError, ValueError):
+        return None
 
+
+def close_image_bytes(images: list[mmap.mmap] | None) -> None:
+    for image in images or []:
+        image.close()
+
+
+def auto_extract_results(docs: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    latest = latest_analyses_bulk([doc["id"] for doc in docs], "auto_extract")
     return {
-        "id": row["id"],
-        "filename": row["filename"],
-        "file_type": row["file_type"],
-        "file_size": row["file_size"],
-        "uploaded_at": row["uploaded_at"],
-        "preview_text": row["preview_text"],
-        "version_group": row["version_group"],
-        "version_number": row["version_number"],
-        "analysis_status": row["analysis_status"],
-        "summary_brief": summary_brief,
+        doc["id"]: latest[doc["id"]]["result"] if doc["id"] in latest else {}
+        for doc in docs
     }
 
 
-def run_auto_analysis(document_row: dict[str, Any]) -> dict[str, Any]:
-    path = Path(document_row["file_path"])
-    image_bytes: list[bytes] | None = None
-    if document_row["file_type"] in {"png", "jpg", "jpeg"} and path.exists():
-        image_bytes = [path.read_bytes()]
+async def run_auto_analysis(document_row: dict[str, Any]) -> dict[str, Any]:
+    image_bytes = await asyncio.to_thread(read_image_bytes, document_row)
+    try:
+        result, _ = await cached_analyze_document(
+            text=document_row["full_text"],
+            filename=document_row["filename"],
+            ollama=ollama,
+            image_bytes=image_bytes,
+        )
+    finally:
+        close_image_bytes(image_bytes)
+    document_id = document_row["id"]
+
+    def write(conn: sqlite3.Connection) -> None:
+        insert_analysis(conn, document_id, "auto_extract", "default", result)
+        replace_entities(conn, document_id, result.get("entities", []))
+        conn.execute(
+            "UPDATE documents SET analysis_status = ? WHERE id = ?",
+            ("complete", document_id),
+        )
 
-    result = analyze_document(
-        text=document_row["full_text"],
-        filename=document_row["filename"],
-        ollama=ollama,
-        image_bytes=image_bytes,
-    )
-    save_analysis(document_row["id"], "auto_extract", "default", result)
-    replace_entities(document_row["id"], result.get("entities", []))
-    db.execute(
-        "UPDATE documents SET analysis_status = ? WHERE id = ?",
-        ("complete", document_row["id"]),
-    )
+    await asyncio.to_thread(db.write_batch, write)
     return result
 
 
@@ -284,38 +561,354 @@ def document_versions(document_id: str) -> list[dict[str, Any]]:
     return rows
 
 
-@app.get("/health")
-def health() -> dict[str, Any]:
-    ollama_health = ollama.health()
-    doc_count = db.fetch_one("SELECT COUNT(*) AS count FROM documents") or {"count": 0}
-    return {
-        "status": "ok",
-        "mode": "local-only",
-        "version": "2.0.0",
-        "ollama": ollama_health,
-        "documents": doc_count["count"],
-        "supported_types": list(SUPPORTED_EXTENSIONS.values()),
-    }
+EXPORT_CSV_FIELDS = [
+    "document_id",
+    "filename",
+    "version_group",
+    "version_number",
+    "entity_type",
+    "entity_value",
+    "confidence",
+    "snippet",
+    "summary_brief",
+]
+EXPORT_FLUSH_BYTES = 64 * 1024
 
 
-@app.get("/dashboard")
-def dashboard() -> dict[str, Any]:
-    stats = {
-        "documents": (db.fetch_one("SELECT COUNT(*) AS c FROM documents") or {"c": 0})[
-            "c"
-        ],
-    }
+def group_entities(entities: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    grouped: dict[str, list[dict[str, Any]]] = {}
+    for entity in entities:
+        grouped.setdefault(entity["document_id"], []).append(entity)
+    return grouped
 
-    recent_documents = db.fetch_all(
-        "SELECT * FROM documents ORDER BY uploaded_at DESC LIMIT 8"
+
+def json_id_list(document_ids: list[str]) -> str:
+    # Bound once as a JSON array and expanded with json_each, so the id list
+    # is never repeated per query or capped by SQLite's variable limit.
+    return orjson.dumps(document_ids).decode("utf-8")
+
+
+def export_json_rows(document_ids: list[str]) -> list[str]:
+    # SQLite's JSON1 functions assemble each document object, including its
+    # entities and latest auto_extract result, as ready-to-send JSON text.
+    rows = db.fetch_all(
+        """
+        WITH ids(id) AS (SELECT value FROM json_each(?)),
+        latest AS (
+            SELECT document_id, result_json
+            FROM (
+                SELECT
+                    document_id,
+                    result_json,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY document_id ORDER BY created_at DESC
+                    ) AS rn
+                FROM document_analyses
+                WHERE analysis_type = 'auto_extract'
+                    AND document_id IN (SELECT id FROM ids)
+            )
+            WHERE rn = 1 AND json_valid(result_json)
+        )
+        SELECT json_object(
+            'id', d.id,
+            'filename', d.filename,
+            'file_type', d.file_type,
+            'file_size', d.file_size,
+            'uploaded_at', d.uploaded_at,
+            'preview_text', d.preview_text,
+            'version_group', d.version_group,
+            'version_number', d.version_number,
+            'analysis_status', d.analysis_status,
+            'summary_brief', COALESCE(
+                CAST(json_extract(l.result_json, '$.summary_brief') AS TEXT), ''
+            ),
+            'entities', json((
+                SELECT json_group_array(json_object(
+                    'document_id', e.document_id,
+                    'entity_type', e.entity_type,
+                    'entity_value', e.entity_value,
+                    'confidence', e.confidence,
+                    'snippet', e.snippet
+                ))
+                FROM (
+                    SELECT document_id, entity_type, entity_value, confidence, snippet
+                    FROM document_entities
+                    WHERE document_id = d.id
+                    ORDER BY confidence DESC
+                ) AS e
+            )),
+            'analysis', json(COALESCE(l.result_json, '{}'))
+        ) AS doc_json
+        FROM documents AS d
+        LEFT JOIN latest AS l ON l.document_id = d.id
+        WHERE d.id IN (SELECT id FROM ids)
+        ORDER BY d.uploaded_at DESC
+        """,
+        (json_id_list(document_ids),),
     )
-    return {
-        "stats": stats,
-        "recent_documents": [format_document_row(row) for row in recent_documents],
-    }
+    return [row["doc_json"] for row in rows]
+
+
+def export_json_chunks(documents: list[str]) -> Iterator[bytes]:
+    buffer = bytearray(
+        b'{"generated_at":' + orjson.dumps(now_iso()) + b',"documents":['
+    )
+    for index, doc_json in enumerate(documents):
+        if index:
+            buffer += b","
+        buffer += doc_json.encode("utf-8")
+        if len(buffer) >= EXPORT_FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]}"
+    yield bytes(buffer)
+
+
+ExportSources = tuple[
+    list[dict[str, Any]], list[dict[str, Any]], dict[str, dict[str, Any]]
+]
+
+
+def export_sources(document_ids: list[str]) -> ExportSources:
+    id_list = json_id_list(document_ids)
+    docs = db.fetch_all(
+        """
+        SELECT id, filename, uploaded_at, version_group, version_number
+        FROM documents
+        WHERE id IN (SELECT value FROM json_each(?))
+        ORDER BY uploaded_at DESC
+        """,
+        (id_list,),
+    )
+    entities = db.fetch_all(
+        """
+        SELECT document_id, entity_type, entity_value, confidence, snippet
+        FROM document_entities
+        WHERE document_id IN (SELECT value FROM json_each(?))
+        ORDER BY document_id, confidence DESC
+        """,
+        (id_list,),
+    )
+    return docs, entities, auto_extract_results(docs)
+
+
+def export_csv_chunks(sources: ExportSources) -> Iterator[bytes]:
+    docs, entities, analysis_map = sources
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_CSV_FIELDS)
+    writer.writeheader()
+
+    doc_by_id = {doc["id"]: doc for doc in docs}
+    for entity in entities:
+        doc = doc_by_id.get(entity["document_id"])
+        if not doc:
+            continue
+        summary_brief = str(analysis_map.get(doc["id"], {}).get("summary_brief") or "")
+        writer.writerow(
+            {
+                "document_id": doc["id"],
+                "filename": doc["filename"],
+                "version_group": doc["version_group"],
+                "version_number": doc["version_number"],
+                "entity_type": entity["entity_type"],
+                "entity_value": entity["entity_value"],
+                "confidence": entity["confidence"],
+                "snippet": entity["snippet"],
+                "summary_brief": summary_brief,
+            }
+        )
+        if output.tell() >= EXPORT_FLUSH_BYTES:
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate(0)
+
+    yield output.getvalue().encode("utf-8")
+
+
+def export_report_chunks(sources: ExportSources) -> Iterator[bytes]:
+    docs, entities, analysis_map = sources
+    entities_by_doc = group_entities(entities)
+    yield "\n".join(
+        ["# Smart Document Intelligence Report", "", f"Generated: {now_iso()}", ""]
+    ).encode("utf-8")
+    for doc in docs:
+        lines: list[str] = [""]
+        lines.append(f"## {doc['filename']} (v{doc['version_number']})")
+        lines.append(f"- Document ID: `{doc['id']}`")
+        lines.append(f"- Uploaded: {doc['uploaded_at']}")
+        lines.append(f"- Version Group: `{doc['version_group']}`")
+
+        analysis = analysis_map.get(doc["id"], {})
+        if analysis:
+            lines.append(f"- Brief Summary: {analysis.get('summary_brief', '')}")
+
+        doc_entities = entities_by_doc.get(doc["id"], [])[:15]
+        if doc_entities:
+            lines.append("- Extracted Entities:")
+            for entity in doc_entities:
+                lines.append(
+                    f"  - [{entity['entity_type']}] {entity['entity_value']} (confidence {float(entity['confidence']):.2f})"
+                )
+
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+
+# format -> (query, renderer, filename template, media type)
+EXPORT_FORMATS = {
+    "json": (
+        export_json_rows,
+        export_json_chunks,
+        "document-export-{timestamp}.json",
+        "application/json",
+    ),
+    "csv": (
+        export_sources,
+        export_csv_chunks,
+        "document-export-{timestamp}.csv",
+        "text/csv",
+    ),
+    "report": (
+        export_sources,
+        export_report_chunks,
+        "document-report-{timestamp}.md",
+        "text/markdown",
+    ),
+}
+
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File exceeds max upload size of {MAX_UPLOAD_BYTES // (1024 * 1024)}MB.",
+    )
+
+
+async def write_upload_chunks(destination: Path, chunks: AsyncIterator[bytes]) -> None:
+    if uring_available():
+        await write_and_sync(destination, chunks)
+        return
+    async with aiofiles.open(destination, "wb") as handle:
+        async for chunk in chunks:
+            await handle.write(chunk)
+
+
+async def save_upload(file: UploadFile, destination: Path) -> tuple[int, str]:
+    """Stream an upload to disk, hashing as it goes. Returns (size, checksum)."""
+    hasher = content_hasher()
+    size = 0
 
+    async def read_chunks() -> AsyncIterator[bytes]:
+        nonlocal size
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise upload_too_large()
+            hasher.update(chunk)
+            yield chunk
+
+    try:
+        await write_upload_chunks(destination, read_chunks())
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return size, hasher.hexdigest()
+
+
+# Load balancers poll /health every few seconds; probe Ollama and count
+# documents at most once per TTL and serve the cached payload in between.
+HEALTH_TTL_SECONDS = 2.0
+_health_cache: dict[str, Any] = {"ts": 0.0, "value": None}
+_health_lock = asyncio.Lock()
+
+
+@app.get("/health", response_class=ORJSONResponse, response_model=None)
+async def health() -> dict[str, Any]:
+    async with _health_lock:
+        if (
+            _health_cache["value"] is not None
+            and time.monotonic() - _health_cache["ts"] < HEALTH_TTL_SECONDS
+        ):
+            return _health_cache["value"]
+
+        ollama_health, doc_count = await asyncio.gather(
+            asyncio.to_thread(ollama.health),
+            asyncio.to_thread(db.fetch_one, "SELECT COUNT(*) AS count FROM documents"),
+        )
+        doc_count = doc_count or {"count": 0}
+        value = {
+            "status": "ok",
+            "mode": "local-only",
+            "version": "2.0.0",
+            "ollama": ollama_health,
+            "documents": doc_count["count"],
+            "supported_types": list(SUPPORTED_EXTENSIONS.values()),
+        }
+        _health_cache.update(ts=time.monotonic(), value=value)
+        return value
+
+
+@app.get("/dashboard")
+async def dashboard() -> ORJSONResponse:
+    count_row, recent_documents = await asyncio.gather(
+        asyncio.to_thread(db.fetch_one, "SELECT COUNT(*) AS c FROM documents"),
+        asyncio.to_thread(
+            db.fetch_all, "SELECT * FROM documents ORDER BY uploaded_at DESC LIMIT 8"
+        ),
+    )
+    stats = {"documents": (count_row or {"c": 0})["c"]}
+    return ORJSONResponse(
+        {
+            "stats": stats,
+            "recent_documents": await asyncio.to_thread(
+                format_document_rows, recent_documents
+            ),
+        }
+    )
+
+
+async def extract_text(path: Path, file_type: str, size: int) -> str:
+    # PDF and OCR parsing is pure-Python CPU work; large files go to worker
+    # processes so they neither hold the GIL nor serialize behind each other.
+    # Small files stay in a thread where IPC would cost more than parsing.
+    # Large PDFs skip parse_pool and fan their pages out over the page pool.
+    if size <= PARSE_INLINE_MAX_BYTES:
+        return await asyncio.to_thread(parse_document, path, file_type)
+    if file_type == "pdf":
+        return await asyncio.to_thread(
+            parse_document, path, file_type, offload_pdf=True
+        )
+    return await parse_in_pool(path, file_type)
+
+
+def replace_broken_parse_pool(broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    # A crashed worker breaks the whole pool. Concurrent uploads all see the
+    # same broken pool; only the first replaces it.
+    global parse_pool
+    if parse_pool is broken:
+        parse_pool = new_parse_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+    return parse_pool
+
+
+async def parse_in_pool(path: Path, file_type: str) -> str:
+    loop = asyncio.get_running_loop()
+    pool = parse_pool
+    try:
+        return await loop.run_in_executor(pool, parse_document, path, file_type)
+    except BrokenProcessPool:
+        pool = replace_broken_parse_pool(pool)
+    # Retry once: the crash may have been caused by another upload's file.
+    try:
+        return await loop.run_in_executor(pool, parse_document, path, file_type)
+    except BrokenProcessPool:
+        replace_broken_parse_pool(pool)
+        raise
 
-@app.post("/documents/upload")
+
+@app.post("/documents/upload", response_class=ORJSONResponse, response_model=None)
 async def upload_document(
     file: UploadFile = File(...),
     version_group: str | None = Form(default=None),
@@ -331,34 +924,21 @@ async def upload_document(
             detail=f"Unsupported file type. Allowed: {', '.join(sorted(SUPPORTED_EXTENSIONS.keys()))}",
         )
 
-    raw = await file.read()
-    if not raw:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
-    if len(raw) > MAX_UPLOAD_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File exceeds max upload size of {MAX_UPLOAD_BYTES // (1024 * 1024)}MB.",
-        )
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise upload_too_large()
 
     doc_id = uuid.uuid4().hex
     stored_path = UPLOAD_DIR / f"{doc_id}{extension}"
-    stored_path.write_bytes(raw)
+    file_size, checksum = await save_upload(file, stored_path)
 
     file_type = SUPPORTED_EXTENSIONS[extension]
-    checksum = sha256_bytes(raw)
     group = clean_version_group(version_group, original_name)
 
     if parent_document_id:
-        _ = get_document_or_404(parent_document_id)
-
-    max_version_row = db.fetch_one(
-        "SELECT MAX(version_number) AS max_version FROM documents WHERE version_group = ?",
-        (group,),
-    )
-    next_version = int(max_version_row.get("max_version") or 0) + 1
+        _ = await asyncio.to_thread(get_document_or_404, parent_document_id)
 
     try:
-        extracted_text = parse_document(stored_path, file_type)
+        extracted_text = await extract_text(stored_path, file_type, file_size)
     except Exception as exc:
         raise HTTPException(
             status_code=400, detail=f"Failed to process file: {exc}"
@@ -367,57 +947,84 @@ async def upload_document(
     preview_text = (
         build_preview(extracted_text) if extracted_text else "No text extracted."
     )
-    uploaded_at = now_iso()
-
-    db.execute(
-        """
-        INSERT INTO documents(
-            id,
-            filename,
-            file_path,
-            file_type,
-            file_size,
-            checksum,
-            uploaded_at,
-            preview_text,
-            full_text,
-            version_group,
-            version_number,
-            parent_document_id,
-            analysis_status
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            doc_id,
-            original_name,
-            str(stored_path),
-            file_type,
-            len(raw),
-            checksum,
-            uploaded_at,
-            preview_text,
-            extracted_text,
-            group,
-            next_version,
-            parent_document_id,
-            "processing" if auto_analyze else "pending",
-        ),
+    chunks = (
+        await asyncio.to_thread(chunk_text, extracted_text) if extracted_text else []
     )
+    uploaded_at = now_iso()
 
-    if extracted_text:
-        store_chunks(doc_id, extracted_text)
-
-    document = get_document_or_404(doc_id)
+    def write(conn: sqlite3.Connection) -> int:
+        version_number = allocate_version(conn, group)
+        conn.execute(
+            """
+            INSERT INTO documents(
+                id,
+                filename,
+                file_path,
+                file_type,
+                file_size,
+                checksum,
+                uploaded_at,
+                preview_text,
+                full_text,
+                version_group,
+                version_number,
+                parent_document_id,
+                analysis_status
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                doc_id,
+                original_name,
+                str(stored_path),
+                file_type,
+                file_size,
+                checksum,
+                uploaded_at,
+                preview_text,
+                extracted_text,
+                group,
+                version_number,
+                parent_document_id,
+                "processing" if auto_analyze else "pending",
+            ),
+        )
+        if chunks:
+            store_chunks(conn, doc_id, chunks)
+        return version_number
+
+    version_number = await asyncio.to_thread(db.write_batch, write)
+
+    # Everything in the row is already in scope; skip re-reading it.
+    document = {
+        "id": doc_id,
+        "filename": original_name,
+        "file_path": str(stored_path),
+        "file_type": file_type,
+        "file_size": file_size,
+        "checksum": checksum,
+        "uploaded_at": uploaded_at,
+        "preview_text": preview_text,
+        "full_text": extracted_text,
+        "version_group": group,
+        "version_number": version_number,
+        "parent_document_id": parent_document_id,
+        "analysis_status": "processing" if auto_analyze else "pending",
+    }
 
     auto_extract: dict[str, Any] | None = None
+    summary_brief = ""
     if auto_analyze:
         try:
-            auto_extract = run_auto_analysis(document)
+            auto_extract = await run_auto_analysis(document)
+            document["analysis_status"] = "complete"
+            summary_brief = summary_brief_of(auto_extract)
         except Exception as exc:
-            db.execute(
+            await asyncio.to_thread(
+                db.execute,
                 "UPDATE documents SET analysis_status = ? WHERE id = ?",
                 ("failed", doc_id),
             )
+            document["analysis_status"] = "failed"
             auto_extract = {
                 "summary_brief": "Automatic AI extraction failed.",
                 "summary_detailed": str(exc),
@@ -427,58 +1034,74 @@ async def upload_document(
             }
 
     return {
-        "document": format_document_row(get_document_or_404(doc_id)),
+        "document": format_document_row(document, {doc_id: summary_brief}),
         "analysis": auto_extract,
     }
 
 
-@app.post("/upload")
+@app.post("/upload", response_class=ORJSONResponse, response_model=None)
 async def legacy_upload(file: UploadFile = File(...)) -> dict[str, Any]:
-    response = await upload_document(file=file)
+    response = await upload_document(
+        file=file, version_group=None, parent_document_id=None, auto_analyze=True
+    )
     document = response["document"]
+    stored = await asyncio.to_thread(get_document_or_404, document.id)
     return {
-        "document_id": document["id"],
-        "filename": document["filename"],
+        "document_id": document.id,
+        "filename": document.filename,
         "pages": 0,
-        "chars": len(get_document_or_404(document["id"])["full_text"]),
+        "chars": len(stored["full_text"]),
         "truncated": False,
     }
 
 
 @app.get("/documents")
-def list_documents() -> dict[str, Any]:
-    rows = db.fetch_all("SELECT * FROM documents ORDER BY uploaded_at DESC")
-    return {"documents": [format_document_row(row) for row in rows]}
+async def list_documents() -> ORJSONResponse:
+    rows = await asyncio.to_thread(
+        db.fetch_all, "SELECT * FROM documents ORDER BY uploaded_at DESC"
+    )
+    documents = await asyncio.to_thread(format_document_rows, rows)
+    return ORJSONResponse({"documents": documents})
 
 
-@app.delete("/documents/{document_id}")
-def delete_document(document_id: str) -> dict[str, Any]:
-    document = get_document_or_404(document_id)
+@app.delete(
+    "/documents/{document_id}", response_class=ORJSONResponse, response_model=None
+)
+async def delete_document(document_id: str) -> dict[str, Any]:
+    document = await asyncio.to_thread(get_document_or_404, document_id)
     file_path = Path(document["file_path"])
 
     if file_path.exists():
         try:
-            file_path.unlink()
+            await asyncio.to_thread(file_path.unlink)
         except OSError as exc:
             raise HTTPException(
                 status_code=500, detail=f"Failed to delete file from disk: {exc}"
             ) from exc
 
-    db.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+    await asyncio.to_thread(
+        db.execute, "DELETE FROM documents WHERE id = ?", (document_id,)
+    )
     return {"status": "deleted", "document_id": document_id}
 
 
 @app.get("/documents/{document_id}")
-def document_detail(document_id: str) -> dict[str, Any]:
-    document = get_document_or_404(document_id)
-    analyses_rows = db.fetch_all(
-        """
-        SELECT analysis_type, level, result_json, created_at
-        FROM document_analyses
-        WHERE document_id = ?
-        ORDER BY created_at DESC
-        """,
-        (document_id,),
+async def document_detail(document_id: str) -> ORJSONResponse:
+    document = await asyncio.to_thread(get_document_or_404, document_id)
+    analyses_rows, entities, versions, formatted = await asyncio.gather(
+        asyncio.to_thread(
+            db.fetch_all,
+            """
+            SELECT analysis_type, level, result_json, created_at
+            FROM document_analyses
+            WHERE document_id = ?
+            ORDER BY created_at DESC
+            """,
+            (document_id,),
+        ),
+        asyncio.to_thread(list_entities, document_id),
+        asyncio.to_thread(document_versions, document_id),
+        asyncio.to_thread(format_document_row, document),
     )
     analyses = [
         {
@@ -490,41 +1113,48 @@ def document_detail(document_id: str) -> dict[str, Any]:
         for row in analyses_rows
     ]
 
-    return {
-        "document": format_document_row(document),
-        "full_text": document["full_text"],
-        "entities": list_entities(document_id),
-        "analyses": analyses,
-        "versions": document_versions(document_id),
-    }
+    return ORJSONResponse(
+        {
+            "document": formatted,
+            "full_text": document["full_text"],
+            "entities": entities,
+            "analyses": analyses,
+            "versions": versions,
+        }
+    )
 
 
 @app.get("/documents/{document_id}/file")
-def read_document_file(document_id: str) -> FileResponse:
-    document = get_document_or_404(document_id)
+async def read_document_file(document_id: str) -> FileResponse:
+    document = await asyncio.to_thread(get_document_or_404, document_id)
     file_path = Path(document["file_path"])
-    if not file_path.exists():
+    try:
+        stat_result = await asyncio.to_thread(file_path.stat)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File no longer exists on disk.")
 
-    media_type = (
-        MEDIA_TYPES.get(document["file_type"])
-        or mimetypes.guess_type(document["filename"])[0]
-    )
+    media_type = _guess_media(document["filename"], document["file_type"])
     return FileResponse(
         path=file_path,
         media_type=media_type,
+        stat_result=stat_result,
         headers={"Content-Disposition": f'inline; filename="{document["filename"]}"'},
     )
 
 
-@app.get("/documents/{document_id}/summary")
-def get_summary(
+@app.get(
+    "/documents/{document_id}/summary",
+    response_class=ORJSONResponse,
+    response_model=None,
+)
+async def get_summary(
     document_id: str,
     level: str = Query(default="brief", pattern="^(brief|detailed|bullets)$"),
 ) -> dict[str, Any]:
-    document = get_document_or_404(document_id)
+    document = await asyncio.to_thread(get_document_or_404, document_id)
 
-    existing = db.fetch_one(
+    existing = await asyncio.to_thread(
+        db.fetch_one,
         """
         SELECT result_json, created_at
         FROM document_analyses
@@ -542,73 +1172,73 @@ def get_summary(
             "cached": True,
         }
 
-    result = summarize_document(text=document["full_text"], level=level, ollama=ollama)
-    save_analysis(document_id, "summary", level, result)
+    result, cached = await cached_summarize_document(
+        text=document["full_text"], level=level, ollama=ollama
+    )
+    await asyncio.to_thread(save_analysis, document_id, "summary", level, result)
     return {
         "document_id": document_id,
         "summary": result,
         "created_at": now_iso(),
-        "cached": False,
+        "cached": cached,
     }
 
 
-@app.post("/documents/{document_id}/analyze")
-def analyze_document_endpoint(document_id: str) -> dict[str, Any]:
-    document = get_document_or_404(document_id)
-
-    image_bytes: list[bytes] | None = None
-    file_path = Path(document["file_path"])
-    if document["file_type"] in {"png", "jpg", "jpeg"} and file_path.exists():
-        image_bytes = [file_path.read_bytes()]
-
-    result = analyze_document(
-        text=document["full_text"],
-        filename=document["filename"],
-        ollama=ollama,
-        image_bytes=image_bytes,
-    )
-    save_analysis(document_id, "auto_extract", "default", result)
-    replace_entities(document_id, result.get("entities", []))
-    db.execute(
-        "UPDATE documents SET analysis_status = ? WHERE id = ?",
-        ("complete", document_id),
-    )
+@app.post(
+    "/documents/{document_id}/analyze",
+    response_class=ORJSONResponse,
+    response_model=None,
+)
+async def analyze_document_endpoint(document_id: str) -> dict[str, Any]:
+    document = await asyncio.to_thread(get_document_or_404, document_id)
+    result = await run_auto_analysis(document)
     return {"document_id": document_id, "analysis": result}
 
 
-@app.get("/documents/{document_id}/versions")
-def get_versions(document_id: str) -> dict[str, Any]:
-    versions = document_versions(document_id)
+@app.get(
+    "/documents/{document_id}/versions",
+    response_class=ORJSONResponse,
+    response_model=None,
+)
+async def get_versions(document_id: str) -> dict[str, Any]:
+    versions = await asyncio.to_thread(document_versions, document_id)
     return {"document_id": document_id, "versions": versions}
 
 
 @app.post("/compare")
-def compare(payload: CompareRequest) -> dict[str, Any]:
-    left = get_document_or_404(payload.left_document_id)
-    right = get_document_or_404(payload.right_document_id)
+async def compare(payload: CompareRequest) -> ORJSONResponse:
+    left, right = await asyncio.gather(
+        asyncio.to_thread(get_document_or_404, payload.left_document_id),
+        asyncio.to_thread(get_document_or_404, payload.right_document_id),
+    )
 
-    result = compare_documents(
+    result, _ = await cached_compare_documents(
         left_name=left["filename"],
         left_text=left["full_text"],
         right_name=right["filename"],
         right_text=right["full_text"],
         ollama=ollama,
     )
-    save_analysis(left["id"], "comparison", "against:" + right["id"], result)
+    await asyncio.to_thread(
+        save_analysis, left["id"], "comparison", "against:" + right["id"], result
+    )
 
-    return {
-        "left_document": format_document_row(left),
-        "right_document": format_document_row(right),
-        "comparison": result,
-    }
+    left_row, right_row = await asyncio.to_thread(format_document_rows, [left, right])
+    return ORJSONResponse(
+        {
+            "left_document": left_row,
+            "right_document": right_row,
+            "comparison": result,
+        }
+    )
 
 
 @app.post("/export")
-def export_data(payload: ExportRequest) -> StreamingResponse:
+async def export_data(payload: ExportRequest) -> StreamingResponse:
     selected_ids = payload.document_ids
     if not selected_ids:
-        selected_rows = db.fetch_all(
-            "SELECT id FROM documents ORDER BY uploaded_at DESC"
+        selected_rows = await asyncio.to_thread(
+            db.fetch_all, "SELECT id FROM documents ORDER BY uploaded_at DESC"
         )
         selected_ids = [row["id"] for row in selected_rows]
 
@@ -617,135 +1247,32 @@ def export_data(payload: ExportRequest) -> StreamingResponse:
             status_code=400, detail="No documents available for export."
         )
 
-    placeholders = ",".join("?" for _ in selected_ids)
-    docs = db.fetch_all(
-        f"SELECT * FROM documents WHERE id IN ({placeholders}) ORDER BY uploaded_at DESC",
-        tuple(selected_ids),
-    )
-    if not docs:
-        raise HTTPException(status_code=404, detail="Selected documents not found.")
-
-    entities = db.fetch_all(
-        f"""
-        SELECT document_id, entity_type, entity_value, confidence, snippet
-        FROM document_entities
-        WHERE document_id IN ({placeholders})
-        ORDER BY document_id, confidence DESC
-        """,
-        tuple(selected_ids),
-    )
-
-    analysis_map: dict[str, dict[str, Any]] = {}
-    for document in docs:
-        latest = latest_analysis(document["id"], "auto_extract")
-        analysis_map[document["id"]] = latest["result"] if latest else {}
-
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     export_format = payload.format.lower().strip()
-
-    if export_format == "json":
-        content = {
-            "generated_at": now_iso(),
-            "documents": [
-                {
-                    **format_document_row(doc),
-                    "entities": [
-                        row for row in entities if row["document_id"] == doc["id"]
-                    ],
-                    "analysis": analysis_map.get(doc["id"], {}),
-                }
-                for doc in docs
-            ],
-        }
-        raw = json.dumps(content, indent=2).encode("utf-8")
-        filename = f"document-export-{timestamp}.json"
-        media_type = "application/json"
-
-    elif export_format == "csv":
-        output = io.StringIO()
-        writer = csv.DictWriter(
-            output,
-            fieldnames=[
-                "document_id",
-                "filename",
-                "version_group",
-                "version_number",
-                "entity_type",
-                "entity_value",
-                "confidence",
-                "snippet",
-                "summary_brief",
-            ],
-        )
-        writer.writeheader()
-
-        doc_by_id = {doc["id"]: doc for doc in docs}
-        for entity in entities:
-            doc = doc_by_id.get(entity["document_id"])
-            if not doc:
-                continue
-            summary_brief = str(
-                analysis_map.get(doc["id"], {}).get("summary_brief") or ""
-            )
-            writer.writerow(
-                {
-                    "document_id": doc["id"],
-                    "filename": doc["filename"],
-                    "version_group": doc["version_group"],
-                    "version_number": doc["version_number"],
-                    "entity_type": entity["entity_type"],
-                    "entity_value": entity["entity_value"],
-                    "confidence": entity["confidence"],
-                    "snippet": entity["snippet"],
-                    "summary_brief": summary_brief,
-                }
-            )
-
-        raw = output.getvalue().encode("utf-8")
-        filename = f"document-export-{timestamp}.csv"
-        media_type = "text/csv"
-
-    elif export_format == "report":
-        lines: list[str] = [
-            "# Smart Document Intelligence Report",
-            "",
-            f"Generated: {now_iso()}",
-            "",
-        ]
-        for doc in docs:
-            lines.append(f"## {doc['filename']} (v{doc['version_number']})")
-            lines.append(f"- Document ID: `{doc['id']}`")
-            lines.append(f"- Uploaded: {doc['uploaded_at']}")
-            lines.append(f"- Version Group: `{doc['version_group']}`")
-
-            analysis = analysis_map.get(doc["id"], {})
-            if analysis:
-                lines.append(f"- Brief Summary: {analysis.get('summary_brief', '')}")
-
-            doc_entities = [
-                entity for entity in entities if entity["document_id"] == doc["id"]
-            ][:15]
-            if doc_entities:
-                lines.append("- Extracted Entities:")
-                for entity in doc_entities:
-                    lines.append(
-                        f"  - [{entity['entity_type']}] {entity['entity_value']} (confidence {float(entity['confidence']):.2f})"
-                    )
-
-            lines.append("")
-
-        raw = "\n".join(lines).encode("utf-8")
-        filename = f"document-report-{timestamp}.md"
-        media_type = "text/markdown"
-
-    else:
+    if export_format not in EXPORT_FORMATS:
         raise HTTPException(
             status_code=400,
             detail="Unsupported export format. Use json, csv, or report.",
         )
 
+    found = await asyncio.to_thread(
+        db.fetch_all,
+        "SELECT id FROM documents WHERE id IN (SELECT value FROM json_each(?))",
+        (json_id_list(selected_ids),),
+    )
+    if not found:
+        raise HTTPException(status_code=404, detail="Selected documents not found.")
+
+    query, render, filename_template, media_type = EXPORT_FORMATS[export_format]
+    filename = filename_template.format(
+        timestamp=datetime.now().strftime("%Y%m%d-%H%M%S")
+    )
+
+    # Query before the response starts so database errors still surface as
+    # a 500 rather than a truncated 200. Starlette drains the sync renderer
+    # in its thread pool, so encoding stays off the event loop.
+    sources = await asyncio.to_thread(query, [row["id"] for row in found])
     return StreamingResponse(
-        io.BytesIO(raw),
+        render(sources),
         media_type=media_type,
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -11,6 +11,8 @@ DB_PATH = Path(os.getenv("DOC_INTEL_DB_PATH", DATA_DIR / "document_intel.db"))
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
 OLLAMA_VISION_MODEL = os.getenv("OLLAMA_VISION_MODEL", "")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "16384"))
 CORS_ORIGINS = [
     origin.strip()
     for origin in os.getenv(
@@ -22,6 +24,14 @@ CORS_ORIGINS = [
 
 MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(35 * 1024 * 1024)))
 MAX_CONTEXT_CHARS = int(os.getenv("MAX_CONTEXT_CHARS", "24000"))
+THREADPOOL_WORKERS = int(os.getenv("THREADPOOL_WORKERS", "64"))
+PARSE_PROCESS_WORKERS = int(
+    os.getenv("PARSE_PROCESS_WORKERS", str(os.cpu_count() or 1))
+)
+PARSE_INLINE_MAX_BYTES = int(os.getenv("PARSE_INLINE_MAX_BYTES", str(2 * 1024 * 1024)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
 
 SUPPORTED_EXTENSIONS: dict[str, str] = {
     ".pdf": "pdf",
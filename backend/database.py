@@ -1,24 +1,83 @@
 from __future__ import annotations
 
+import queue
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
 from threading import Lock
-from typing import Any
+from typing import Any, Callable, Iterator, TypeVar
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA mmap_size = 268435456;",
+    "PRAGMA cache_size = -65536;",
+)
+
+T = TypeVar("T")
 
 
 class Database:
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, reader_pool_size: int = 8) -> None:
         self.path = path
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._write_lock = Lock()
+        self._writer: sqlite3.Connection | None = None
+        self._readers: queue.Queue[sqlite3.Connection] = queue.Queue(
+            maxsize=reader_pool_size
+        )
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Autocommit mode: writes open their own BEGIN IMMEDIATE/COMMIT and
+        # pooled readers always see the latest committed snapshot.
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=256,
+            isolation_level=None,
+        )
         conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        conn.execute("PRAGMA journal_mode = WAL;")
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
         return conn
 
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        try:
+            self._readers.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _writer_connection(self) -> sqlite3.Connection:
+        # Callers must hold self._write_lock.
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def close(self) -> None:
+        # PRAGMA optimize refreshes planner statistics for the whole database,
+        # so it runs once here on the writer rather than per connection.
+        with self._write_lock:
+            if self._writer is not None:
+                try:
+                    self._writer.execute("PRAGMA optimize;")
+                except sqlite3.Error:
+                    pass
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
     def init_schema(self) -> None:
         schema = """
         CREATE TABLE IF NOT EXISTS documents (
@@ -61,6 +120,8 @@ class Database:
         );
 
         CREATE INDEX IF NOT EXISTS idx_analyses_doc_type ON document_analyses(document_id, analysis_type, level);
+        CREATE INDEX IF NOT EXISTS idx_analyses_latest ON document_analyses(document_id, analysis_type, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_analyses_doc_created ON document_analyses(document_id, created_at DESC);
 
         CREATE TABLE IF NOT EXISTS document_entities (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -76,6 +137,27 @@ class Database:
         );
 
         CREATE INDEX IF NOT EXISTS idx_entities_document_id ON document_entities(document_id, entity_type);
+        CREATE INDEX IF NOT EXISTS idx_entities_doc_conf ON document_entities(document_id, confidence DESC, entity_type, entity_value);
+
+        CREATE TABLE IF NOT EXISTS version_counters (
+            version_group TEXT PRIMARY KEY,
+            next_version INTEGER NOT NULL
+        );
+
+        INSERT INTO version_counters(version_group, next_version)
+        SELECT version_group, MAX(version_number) FROM documents WHERE true
+        GROUP BY version_group
+        ON CONFLICT(version_group) DO UPDATE
+        SET next_version = MAX(next_version, excluded.next_version);
+
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            cache_key TEXT PRIMARY KEY,
+            analysis_type TEXT NOT NULL,
+            level TEXT NOT NULL,
+            result_json TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache(created_at);
 
         DROP TABLE IF EXISTS template_runs;
         DROP TABLE IF EXISTS templates;
@@ -84,35 +166,59 @@ class Database:
         DROP TABLE IF EXISTS notifications;
         DROP TABLE IF EXISTS messages;
         DROP TABLE IF EXISTS conversations;
+
+        PRAGMA analysis_limit = 1000;
+        ANALYZE;
         """
-        with self._connect() as conn:
-            conn.executescript(schema)
+        with self._write_lock:
+            self._writer_connection().executescript(schema)
 
-    def execute(self, sql: str, params: tuple[Any, ...] = ()) -> int:
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        # Holds the (non-reentrant) write lock for the whole block; use the
+        # yielded connection directly rather than calling execute() inside.
         with self._write_lock:
-            with self._connect() as conn:
-                cursor = conn.execute(sql, params)
-                conn.commit()
-                return cursor.rowcount
+            conn = self._writer_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def execute(self, sql: str, params: tuple[Any, ...] = ()) -> int:
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def write_batch(self, callback: Callable[[sqlite3.Connection], T]) -> T:
+        # Runs several statements as one transaction: one lock acquisition and
+        # one WAL commit instead of one per statement.
+        with self.transaction() as conn:
+            return callback(conn)
 
     def executemany(self, sql: str, seq_of_params: list[tuple[Any, ...]]) -> None:
         if not seq_of_params:
             return
-        with self._write_lock:
-            with self._connect() as conn:
-                conn.executemany(sql, seq_of_params)
-                conn.commit()
+        with self.transaction() as conn:
+            conn.executemany(sql, seq_of_params)
 
     def fetch_one(
         self, sql: str, params: tuple[Any, ...] = ()
     ) -> dict[str, Any] | None:
-        with self._connect() as conn:
+        conn = self._acquire_reader()
+        try:
             row = conn.execute(sql, params).fetchone()
+        finally:
+            self._release_reader(conn)
         if row is None:
             return None
         return dict(row)
 
     def fetch_all(self, sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
-        with self._connect() as conn:
+        conn = self._acquire_reader()
+        try:
             rows = conn.execute(sql, params).fetchall()
+        finally:
+            self._release_reader(conn)
         return [dict(row) for row in rows]
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
 import hashlib
+import multiprocessing
+import os
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from typing import Any
 
 from PIL import Image
 from pypdf import PdfReader
@@ -13,16 +19,137 @@ try:
 except Exception:  # pragma: no cover - optional dependency at runtime
     pytesseract = None
 
+try:
+    import blake3
+except Exception:  # pragma: no cover - optional dependency at runtime
+    blake3 = None
+
+try:
+    import charset_normalizer
+except Exception:  # pragma: no cover - optional dependency at runtime
+    charset_normalizer = None
+
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_WORD_RE = re.compile(r"\S+")
+OCR_MAX_EDGE = 2000
+# LSTM engine only; page segmentation stays automatic for multi-column scans.
+OCR_CONFIG = "--oem 1"
+# Below this many pages, spawning workers costs more than pypdf's decoding.
+PDF_PARALLEL_MIN_PAGES = 8
+
+
+def content_hasher() -> Any:
+    # BLAKE3 hashes large uploads with SIMD and multiple threads; checksums
+    # only key caches, so falling back to SHA-256 merely misses them.
+    if blake3 is not None:
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return hashlib.sha256()
+
+
+def _resolve(value: Any) -> Any:
+    return value.get_object() if value is not None else None
+
+
+def _page_may_have_text(page: Any) -> bool:
+    # Text needs a font. Scanned pages carry only image XObjects, and running
+    # extract_text() on them still decompresses their content for nothing.
+    # Form XObjects can bring their own fonts, so those pages are kept.
+    resources = _resolve(page.get("/Resources"))
+    if not resources:
+        return False
+    if _resolve(resources.get("/Font")):
+        return True
+    xobjects = _resolve(resources.get("/XObject")) or {}
+    return any(
+        _resolve(xobject).get("/Subtype") == "/Form" for xobject in xobjects.values()
+    )
+
+
+def _page_text(page: Any) -> str:
+    if not _page_may_have_text(page):
+        return ""
+    return (page.extract_text() or "").strip()
+
+
+def _extract_pdf_range(path: str, start: int, stop: int) -> list[str]:
+    # pypdf objects do not pickle, so each worker opens its own reader.
+    reader = PdfReader(path)
+    return [_page_text(reader.pages[index]) for index in range(start, stop)]
 
-def sha256_bytes(content: bytes) -> str:
-    return hashlib.sha256(content).hexdigest()
 
+# Set in worker processes of the app's parse pool and of the page pool, so
+# a PDF parsed there stays serial instead of starting another pool per worker.
+_in_pool_worker = False
+_page_pool: ProcessPoolExecutor | None = None
+_page_pool_lock = threading.Lock()
 
-def extract_text_from_pdf(path: Path) -> str:
+
+def mark_pool_worker() -> None:
+    global _in_pool_worker
+    _in_pool_worker = True
+
+
+def _pdf_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=mark_pool_worker,
+            )
+        return _page_pool
+
+
+def _discard_page_pool(broken: ProcessPoolExecutor) -> None:
+    # A crashed worker breaks the pool for every caller; the first one to
+    # notice drops it so the next call starts a fresh one.
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not broken:
+            return
+        _page_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pdf_page_pool() -> None:
+    global _page_pool
+    with _page_pool_lock:
+        pool, _page_pool = _page_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_pdf_pages_in_pool(path: Path, page_count: int, workers: int) -> list[str]:
+    step = -(-page_count // workers)
+    for attempt in range(2):
+        pool = _pdf_page_pool()
+        try:
+            futures = [
+                pool.submit(
+                    _extract_pdf_range, str(path), start, min(start + step, page_count)
+                )
+                for start in range(0, page_count, step)
+            ]
+            return [text for future in futures for text in future.result()]
+        except BrokenProcessPool:
+            _discard_page_pool(pool)
+            if attempt:
+                raise
+    return []
+
+
+def extract_text_from_pdf(path: Path, *, offload: bool = False) -> str:
+    # offload sends even short PDFs to the page pool, keeping a large file's
+    # decoding out of the calling process.
     reader = PdfReader(str(path))
-    pages: list[str] = []
-    for page in reader.pages:
-        pages.append((page.extract_text() or "").strip())
+    page_count = len(reader.pages)
+    workers = min(os.cpu_count() or 1, page_count)
+    parallel = page_count >= PDF_PARALLEL_MIN_PAGES and workers >= 2
+    if _in_pool_worker or not page_count or not (offload or parallel):
+        pages = [_page_text(page) for page in reader.pages]
+    else:
+        pages = _extract_pdf_pages_in_pool(path, page_count, workers)
     return "\n\n".join(part for part in pages if part).strip()
 
 
@@ -36,7 +163,17 @@ def extract_text_from_docx(path: Path) -> str:
 
 def extract_text_from_txt(path: Path) -> str:
     content = path.read_bytes()
-    for encoding in ("utf-8", "utf-16", "latin-1"):
+    try:
+        return content.decode("utf-8-sig").strip()
+    except UnicodeDecodeError:
+        pass
+    # Not UTF-8: detect the encoding once rather than probing, since latin-1
+    # accepts any bytes and turned cp1252 or UTF-16 text into mojibake.
+    if charset_normalizer is not None:
+        best = charset_normalizer.from_bytes(content).best()
+        if best is not None:
+            return str(best).strip()
+    for encoding in ("utf-16", "latin-1"):
         try:
             return content.decode(encoding).strip()
         except UnicodeDecodeError:
@@ -44,16 +181,34 @@ def extract_text_from_txt(path: Path) -> str:
     return content.decode("utf-8", errors="ignore").strip()
 
 
+def _ocr_image(path: Path) -> Image.Image:
+    with Image.open(path) as source:
+        # Tesseract's recognizer cost grows with pixel count and it works on
+        # grayscale anyway: let JPEG decode at reduced size where possible,
+        # then convert and cap the long edge before handing it over.
+        source.draft("L", (OCR_MAX_EDGE, OCR_MAX_EDGE))
+        if source.mode in {"RGBA", "LA", "PA"} or "transparency" in source.info:
+            # Transparent pixels often hold black; flatten onto white first so
+            # dark text on a transparent background stays visible.
+            layer = source.convert("RGBA")
+            background = Image.new("RGBA", layer.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, layer).convert("L")
+        else:
+            image = source.convert("L")
+    if max(image.size) > OCR_MAX_EDGE:
+        image.thumbnail((OCR_MAX_EDGE, OCR_MAX_EDGE), Image.LANCZOS)
+    return image
+
+
 def extract_text_from_image(path: Path) -> str:
     if pytesseract is None:
         return ""
-    image = Image.open(path)
-    return pytesseract.image_to_string(image).strip()
+    return pytesseract.image_to_string(_ocr_image(path), config=OCR_CONFIG).strip()
 
 
-def parse_document(path: Path, file_type: str) -> str:
+def parse_document(path: Path, file_type: str, *, offload_pdf: bool = False) -> str:
     if file_type == "pdf":
-        return extract_text_from_pdf(path)
+        return extract_text_from_pdf(path, offload=offload_pdf)
     if file_type == "docx":
         return extract_text_from_docx(path)
     if file_type == "txt":
@@ -64,31 +219,58 @@ def parse_document(path: Path, file_type: str) -> str:
 
 
 def build_preview(text: str, max_chars: int = 360) -> str:
-    normalized = " ".join(text.split())
+    # Joins words only until the preview overflows instead of normalising the
+    # whole document.
+    words: list[str] = []
+    length = -1
+    for match in _WORD_RE.finditer(text):
+        words.append(match.group())
+        length += len(words[-1]) + 1
+        if length > max_chars:
+            break
+    normalized = " ".join(words)
     if len(normalized) <= max_chars:
         return normalized
     return normalized[: max_chars - 3].rstrip() + "..."
 
 
+def _packing_overlap(text_len: int, chunk_chars: int, max_overlap: int) -> int:
+    # Seamless packing: n full windows leave a remainder, so n + 1 windows are
+    # needed. Spreading the spare room evenly over the n seams gives the
+    # largest overlap that still covers the text with n + 1 windows; use it
+    # unless it exceeds the caller's cap or leaves too little shared context,
+    # in which case the caller's overlap stands.
+    n = text_len // chunk_chars
+    if n < 1:
+        return max_overlap
+    fitting = ((n + 1) * chunk_chars - text_len) // n
+    if fitting < max_overlap // 4:
+        return max_overlap
+    return min(fitting, max_overlap)
+
+
 def chunk_text(text: str, chunk_chars: int = 1200, overlap: int = 180) -> list[str]:
-    cleaned = re.sub(r"\n{3,}", "\n\n", text).strip()
+    # The regex pass costs a full scan; most texts have no run to collapse.
+    if "\n\n\n" in text:
+        text = _BLANK_LINES_RE.sub("\n\n", text)
+    cleaned = text.strip()
     if not cleaned:
         return []
+    overlap = _packing_overlap(len(cleaned), chunk_chars, overlap)
 
     chunks: list[str] = []
     cursor = 0
     text_len = len(cleaned)
     while cursor < text_len:
         end = min(cursor + chunk_chars, text_len)
-        candidate = cleaned[cursor:end]
 
         if end < text_len:
-            last_break = candidate.rfind("\n\n")
+            # Search the window in place; only the final span is sliced.
+            last_break = cleaned.rfind("\n\n", cursor, end) - cursor
             if last_break > chunk_chars // 2:
                 end = cursor + last_break
-                candidate = cleaned[cursor:end]
 
-        chunk = candidate.strip()
+        chunk = cleaned[cursor:end].strip()
         if chunk:
             chunks.append(chunk)
 
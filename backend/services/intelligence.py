@@ -1,10 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import difflib
 import re
+import threading
 from dataclasses import dataclass
 from typing import Any
 
+try:
+    import hyperscan
+except Exception:  # pragma: no cover - optional dependency at runtime
+    hyperscan = None
+
+try:
+    from rapidfuzz.distance import Indel
+except Exception:  # pragma: no cover - optional dependency at runtime
+    Indel = None
+
+try:
+    import re2
+except Exception:  # pragma: no cover - optional dependency at runtime
+    re2 = None
+
 try:
     from config import MAX_CONTEXT_CHARS
     from services.ollama_client import OllamaClient
@@ -24,7 +41,7 @@ ENTITY_KEYS = [
 ]
 
 
-@dataclass
+@dataclass(slots=True)
 class EntityMatch:
     entity_type: str
     value: str
@@ -33,11 +50,135 @@ class EntityMatch:
     start_index: int | None
     end_index: int | None
 
+    def as_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+_FALLBACK_PATTERN_SOURCES: dict[str, str] = {
+    "emails": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
+    "phones": r"(?:\+?\d{1,2}[\s.-]?)?(?:\(\d{3}\)|\d{3})[\s.-]?\d{3}[\s.-]?\d{4}",
+    "amounts": r"(?:USD\s*)?\$\s?\d[\d,]*(?:\.\d{2})?",
+    "dates": r"(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4})|(?:\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{2,4})",
+    "addresses": r"\b\d{1,6}\s+[A-Za-z0-9\s]{2,40}\s(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct)\b[^\n,]*",
+    "organizations": r"\b[A-Z][A-Za-z0-9&.,\-\s]{2,40}\s(?:Inc|LLC|Ltd|Corp|Corporation|University|Bank|Agency)\b",
+    "names": r"\b[A-Z][a-z]+\s+[A-Z][a-z]+\b",
+}
+
+
+# Every character str.isspace() accepts (none lie above U+3000).
+_UNICODE_SPACES = "".join(chr(code) for code in range(0x3001) if chr(code).isspace())
+
+
+def _explicit_classes(pattern: str) -> str:
+    # RE2's \s and \d are ASCII-only while re's are Unicode, and PDF text is
+    # full of no-break and thin spaces; spell out exactly re's classes.
+    parts: list[str] = []
+    in_class = False
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            escape = pattern[index : index + 2]
+            if escape == r"\s":
+                parts.append(_UNICODE_SPACES if in_class else f"[{_UNICODE_SPACES}]")
+            elif escape == r"\d":
+                parts.append(r"\p{Nd}")
+            else:
+                parts.append(escape)
+            index += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        parts.append(char)
+        index += 1
+    return "".join(parts)
+
+
+def _compile_entity_pattern(pattern: str) -> Any:
+    # RE2 scans in linear time and skips non-matching text much faster than
+    # re, but its \b is ASCII-only and would split words such as "ÉLan".
+    if re2 is not None and r"\b" not in pattern:
+        return re2.compile(_explicit_classes(pattern))
+    return re.compile(pattern)
+
+
+# One pass per pattern: a fused alternation resumes after each match, so
+# overlapping entities (a phone number inside an email address, names inside
+# organizations) would be lost.
+_FALLBACK_SCANNERS: tuple[tuple[str, Any], ...] = tuple(
+    (entity_type, _compile_entity_pattern(pattern))
+    for entity_type, pattern in _FALLBACK_PATTERN_SOURCES.items()
+)
+
+
+# Hyperscan cannot reproduce finditer's leftmost-first, non-overlapping match
+# sequence, so it only answers which entity types occur at all: one SIMD pass
+# in prefilter mode (no false negatives) lets fallback_entities skip the
+# passes whose patterns cannot match, which on most documents is most of them.
+def _compile_prefilter() -> Any:
+    if hyperscan is None:
+        return None
+    flags = (
+        hyperscan.HS_FLAG_PREFILTER
+        | hyperscan.HS_FLAG_SINGLEMATCH
+        | hyperscan.HS_FLAG_UTF8
+        | hyperscan.HS_FLAG_UCP
+    )
+    try:
+        database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        database.compile(
+            # Hyperscan's UCP \s also leaves out some of re's spaces.
+            expressions=[
+                _explicit_classes(pattern).encode("utf-8")
+                for pattern in _FALLBACK_PATTERN_SOURCES.values()
+            ],
+            ids=list(range(len(_FALLBACK_PATTERN_SOURCES))),
+            elements=len(_FALLBACK_PATTERN_SOURCES),
+            flags=flags,
+        )
+    except Exception:
+        return None
+    return database
+
+
+_PREFILTER_DB = _compile_prefilter()
+_PREFILTER_TYPES = tuple(_FALLBACK_PATTERN_SOURCES)
+# Scratch space is per scan and fallback_entities runs in worker threads.
+_prefilter_local = threading.local()
 
-def _find_span(text: str, needle: str) -> tuple[int | None, int | None]:
+
+def _present_entity_types(text: str) -> set[str] | None:
+    if _PREFILTER_DB is None:
+        return None
+    try:
+        data = text.encode("utf-8")
+    except UnicodeEncodeError:
+        return None
+    scratch = getattr(_prefilter_local, "scratch", None)
+    if scratch is None:
+        scratch = _prefilter_local.scratch = hyperscan.Scratch(_PREFILTER_DB)
+
+    present: set[str] = set()
+
+    def on_match(
+        pattern_id: int, start: int, end: int, flags: int, context: Any
+    ) -> None:
+        present.add(_PREFILTER_TYPES[pattern_id])
+
+    _PREFILTER_DB.scan(data, match_event_handler=on_match, scratch=scratch)
+    return present
+
+
+_WORD_RE = re.compile(r"\S+")
+_BULLET_SPLIT_RE = re.compile(r"[\n•-]+")
+
+
+def _find_span(text_lower: str, needle: str) -> tuple[int | None, int | None]:
     if not needle:
         return None, None
-    index = text.lower().find(needle.lower())
+    index = text_lower.find(needle.lower())
     if index < 0:
         return None, None
     return index, index + len(needle)
@@ -55,38 +196,33 @@ def fallback_entities(text: str) -> list[EntityMatch]:
     if not text.strip():
         return []
 
-    patterns: dict[str, str] = {
-        "emails": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
-        "phones": r"(?:\+?\d{1,2}[\s.-]?)?(?:\(\d{3}\)|\d{3})[\s.-]?\d{3}[\s.-]?\d{4}",
-        "amounts": r"(?:USD\s*)?\$\s?\d[\d,]*(?:\.\d{2})?",
-        "dates": r"(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4})|(?:\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{2,4})",
-        "addresses": r"\b\d{1,6}\s+[A-Za-z0-9\s]{2,40}\s(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct)\b[^\n,]*",
-        "organizations": r"\b[A-Z][A-Za-z0-9&.,\-\s]{2,40}\s(?:Inc|LLC|Ltd|Corp|Corporation|University|Bank|Agency)\b",
-        "names": r"\b[A-Z][a-z]+\s+[A-Z][a-z]+\b",
-    }
-
-    found: list[EntityMatch] = []
-    for entity_type, pattern in patterns.items():
-        seen: set[str] = set()
-        for match in re.finditer(pattern, text):
+    # Only deduplicated matches become EntityMatch, in one pass at the end.
+    found: list[tuple[str, str, int, int]] = []
+    seen: set[tuple[str, str]] = set()
+    present = _present_entity_types(text)
+    for entity_type, scanner in _FALLBACK_SCANNERS:
+        if present is not None and entity_type not in present:
+            continue
+        for match in scanner.finditer(text):
             value = match.group().strip()
             if len(value) < 3:
                 continue
-            normalized = value.lower()
-            if normalized in seen:
+            key = (entity_type, value.lower())
+            if key in seen:
                 continue
-            seen.add(normalized)
-            found.append(
-                EntityMatch(
-                    entity_type=entity_type,
-                    value=value,
-                    confidence=0.58,
-                    snippet=_snippet(text, match.start(), match.end()),
-                    start_index=match.start(),
-                    end_index=match.end(),
-                )
-            )
-    return found
+            seen.add(key)
+            found.append((entity_type, value, match.start(), match.end()))
+    return [
+        EntityMatch(
+            entity_type=entity_type,
+            value=value,
+            confidence=0.58,
+            snippet=_snippet(text, start, end),
+            start_index=start,
+            end_index=end,
+        )
+        for entity_type, value, start, end in found
+    ]
 
 
 def normalize_entities(payload: dict[str, Any], text: str) -> list[EntityMatch]:
@@ -96,6 +232,7 @@ def normalize_entities(payload: dict[str, Any], text: str) -> list[EntityMatch]:
 
     output: list[EntityMatch] = []
     seen: set[tuple[str, str]] = set()
+    text_lower = text.lower()
 
     for entity_type in ENTITY_KEYS:
         items = entities_obj.get(entity_type, [])
@@ -120,7 +257,7 @@ def normalize_entities(payload: dict[str, Any], text: str) -> list[EntityMatch]:
                 continue
             seen.add(signature)
 
-            start, end = _find_span(text, value)
+            start, end = _find_span(text_lower, value)
             if not snippet:
                 snippet = _snippet(text, start, end)
 
@@ -143,8 +280,20 @@ def normalize_entities(payload: dict[str, Any], text: str) -> list[EntityMatch]:
 def _brief_summary(text: str) -> str:
     if not text.strip():
         return "No readable text was extracted."
-    sentences = re.split(r"(?<=[.!?])\s+", " ".join(text.split()))
-    return " ".join(sentences[:2])[:360]
+    # Walks words only until the second sentence end or the length cap, so
+    # the cost no longer grows with the size of the document.
+    words: list[str] = []
+    length = -1
+    sentences = 0
+    for match in _WORD_RE.finditer(text):
+        word = match.group()
+        words.append(word)
+        length += len(word) + 1
+        if word[-1] in ".!?":
+            sentences += 1
+        if sentences == 2 or length >= 360:
+            break
+    return " ".join(words)[:360]
 
 
 def _detailed_summary(text: str) -> str:
@@ -155,39 +304,54 @@ def _detailed_summary(text: str) -> str:
     return " ".join(top)[:900]
 
 
-def analyze_document(
-    *,
-    text: str,
-    filename: str,
-    ollama: OllamaClient,
-    image_bytes: list[bytes] | None = None,
-) -> dict[str, Any]:
+def _model_name(response: dict[str, Any]) -> str:
+    # Empty when the model call failed or returned unparseable content.
+    if not response or "raw" in response:
+        return ""
+    return str(response.get("_model") or "")
+
+
+async def _ask_model_async(ollama: OllamaClient, **kwargs: Any) -> dict[str, Any]:
+    try:
+        return await ollama.chat_json_async(**kwargs)
+    except Exception:
+        return {}
+
+
+# Every system prompt starts with the same text, schemas included, so Ollama
+# can reuse the evaluated prefix across analysis, summary and comparison
+# requests; each request type appends only its one-line task.
+_BASE_SYSTEM = (
+    "You are a local document intelligence engine. "
+    "Reply with strict JSON only, no prose or markdown, matching exactly the "
+    "schema your task names. If the content is unclear, leave uncertain values "
+    "out instead of hallucinating.\n"
+    "ANALYSIS schema: "
+    '{"summary_brief":string,"summary_detailed":string,"bullet_points":string[],'
+    '"entities":{"names":[],"dates":[],"amounts":[],"addresses":[],'
+    '"organizations":[],"emails":[],"phones":[]},'
+    '"highlights":[{"label":string,"value":string,"snippet":string}]}\n'
+    'SUMMARY schema: {"level":string,"content":string,"bullets":string[]}\n'
+    "COMPARISON schema: "
+    '{"summary":string,"changes":[{"type":string,"description":string,"impact":string}]}\n'
+    "Task: "
+)
+
+
+def _analysis_prompts(text: str, filename: str) -> tuple[str, str]:
     clipped_text = text[:MAX_CONTEXT_CHARS]
     system_prompt = (
-        "You are a local document intelligence engine. "
-        "Return strict JSON with this schema: "
-        '{"summary_brief":string,"summary_detailed":string,"bullet_points":string[],'
-        '"entities":{"names":[],"dates":[],"amounts":[],"addresses":[],'
-        '"organizations":[],"emails":[],"phones":[]},'
-        '"highlights":[{"label":string,"value":string,"snippet":string}]}'
+        _BASE_SYSTEM + "analyze the document and return the ANALYSIS schema."
     )
     user_prompt = (
         f"Document filename: {filename}\n"
-        "Identify key information and provide concise summaries. "
-        "If the content is unclear, leave uncertain values out instead of hallucinating.\n"
+        "Identify key information and provide concise summaries.\n"
         f"Document content:\n{clipped_text if clipped_text else '[no extracted text]'}"
     )
+    return system_prompt, user_prompt
 
-    model_output: dict[str, Any] = {}
-    try:
-        model_output = ollama.chat_json(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            images=image_bytes,
-        )
-    except Exception:
-        model_output = {}
 
+def _build_analysis(model_output: dict[str, Any], text: str) -> dict[str, Any]:
     summary_brief = str(
         model_output.get("summary_brief") or _brief_summary(text)
     ).strip()
@@ -204,7 +368,7 @@ def analyze_document(
     if not bullet_points:
         bullet_points = [
             point
-            for point in re.split(r"[\n•-]+", _brief_summary(text))
+            for point in _BULLET_SPLIT_RE.split(_brief_summary(text))
             if point.strip()
         ][:5]
 
@@ -235,34 +399,46 @@ def analyze_document(
         "summary_brief": summary_brief,
         "summary_detailed": summary_detailed,
         "bullet_points": bullet_points,
-        "entities": [entity.__dict__ for entity in entities],
+        "entities": [entity.as_dict() for entity in entities],
         "highlights": highlights,
         "model_output": model_output,
+        "model": _model_name(model_output),
     }
 
 
-def summarize_document(
-    *, text: str, level: str, ollama: OllamaClient
+async def analyze_document_async(
+    *,
+    text: str,
+    filename: str,
+    ollama: OllamaClient,
+    image_bytes: list[bytes] | None = None,
 ) -> dict[str, Any]:
+    system_prompt, user_prompt = _analysis_prompts(text, filename)
+    model_output = await _ask_model_async(
+        ollama, system_prompt=system_prompt, user_prompt=user_prompt, images=image_bytes
+    )
+    return await asyncio.to_thread(_build_analysis, model_output, text)
+
+
+def _summary_prompts(text: str, level: str) -> tuple[str, str]:
     clipped_text = text[:MAX_CONTEXT_CHARS]
     instructions = {
         "brief": "Produce a concise 2-3 sentence summary.",
         "detailed": "Produce a detailed summary in 3-6 paragraphs.",
         "bullets": "Produce a concise bullet-point summary.",
     }
-    system_prompt = 'Return strict JSON with schema {"level":string,"content":string,"bullets":string[]}'
+    system_prompt = (
+        _BASE_SYSTEM + "summarize the document and return the SUMMARY schema."
+    )
     user_prompt = (
         f"Requested level: {level}\n"
         f"Instruction: {instructions.get(level, instructions['brief'])}\n"
         f"Document content:\n{clipped_text if clipped_text else '[no extracted text]'}"
     )
-    try:
-        response = ollama.chat_json(
-            system_prompt=system_prompt, user_prompt=user_prompt
-        )
-    except Exception:
-        response = {}
+    return system_prompt, user_prompt
+
 
+def _build_summary(response: dict[str, Any], text: str, level: str) -> dict[str, Any]:
     if level == "bullets":
         raw_bullets = response.get("bullets", [])
         bullets = (
@@ -273,35 +449,83 @@ def summarize_document(
         if not bullets:
             bullets = [
                 line.strip()
-                for line in re.split(r"[\n•-]+", _detailed_summary(text))
+                for line in _BULLET_SPLIT_RE.split(_detailed_summary(text))
                 if line.strip()
             ][:8]
         return {
             "level": level,
             "content": "\n".join(f"- {item}" for item in bullets),
             "bullets": bullets,
+            "model": _model_name(response),
         }
 
     content = str(response.get("content") or "").strip()
     if not content:
         content = _brief_summary(text) if level == "brief" else _detailed_summary(text)
-    return {"level": level, "content": content, "bullets": []}
+    return {
+        "level": level,
+        "content": content,
+        "bullets": [],
+        "model": _model_name(response),
+    }
 
 
-def compare_documents(
-    *,
-    left_name: str,
-    left_text: str,
-    right_name: str,
-    right_text: str,
-    ollama: OllamaClient,
+async def summarize_document_async(
+    *, text: str, level: str, ollama: OllamaClient
 ) -> dict[str, Any]:
+    system_prompt, user_prompt = _summary_prompts(text, level)
+    response = await _ask_model_async(
+        ollama, system_prompt=system_prompt, user_prompt=user_prompt
+    )
+    return _build_summary(response, text, level)
+
+
+def _comparison_prompts(
+    left_name: str, left_text: str, right_name: str, right_text: str
+) -> tuple[str, str]:
+    system_prompt = (
+        _BASE_SYSTEM
+        + "compare the two document versions and return the COMPARISON schema."
+    )
+    user_prompt = (
+        f"Left document ({left_name}):\n{left_text[:MAX_CONTEXT_CHARS]}\n\n"
+        f"Right document ({right_name}):\n{right_text[:MAX_CONTEXT_CHARS]}"
+    )
+    return system_prompt, user_prompt
+
+
+def prompt_templates() -> tuple[str, ...]:
+    # Every prompt rendered without document content; the LLM cache keys on
+    # these so editing a prompt retires results produced by the old one.
+    return (
+        *_analysis_prompts("", ""),
+        *(
+            part
+            for level in ("brief", "detailed", "bullets")
+            for part in _summary_prompts("", level)
+        ),
+        *_comparison_prompts("", "", "", ""),
+    )
+
+
+def _similarity(left: str, right: str) -> float:
+    # Both are 2*matches/total. rapidfuzz counts matches with an exact
+    # bit-parallel LCS in C++; SequenceMatcher is pure Python, and its
+    # autojunk heuristic undercounts on long texts with repeated characters.
+    if Indel is not None:
+        return Indel.normalized_similarity(left, right)
+    return difflib.SequenceMatcher(None, left, right).ratio()
+
+
+def _text_diff(
+    left_name: str, left_text: str, right_name: str, right_text: str
+) -> tuple[float, list[str]]:
     left_lines = [line for line in left_text.splitlines() if line.strip()]
     right_lines = [line for line in right_text.splitlines() if line.strip()]
 
-    similarity = difflib.SequenceMatcher(
-        None, left_text[:MAX_CONTEXT_CHARS], right_text[:MAX_CONTEXT_CHARS]
-    ).ratio()
+    similarity = _similarity(
+        left_text[:MAX_CONTEXT_CHARS], right_text[:MAX_CONTEXT_CHARS]
+    )
     diff_lines = list(
         difflib.unified_diff(
             left_lines[:180],
@@ -312,24 +536,12 @@ def compare_documents(
             n=2,
         )
     )
+    return similarity, diff_lines
 
-    system_prompt = (
-        "Compare two document versions and return strict JSON schema: "
-        '{"summary":string,"changes":[{"type":string,"description":string,"impact":string}]}'
-    )
-    user_prompt = (
-        f"Left document ({left_name}):\n{left_text[:MAX_CONTEXT_CHARS]}\n\n"
-        f"Right document ({right_name}):\n{right_text[:MAX_CONTEXT_CHARS]}"
-    )
-
-    response: dict[str, Any] = {}
-    try:
-        response = ollama.chat_json(
-            system_prompt=system_prompt, user_prompt=user_prompt
-        )
-    except Exception:
-        response = {}
 
+def _build_comparison(
+    response: dict[str, Any], similarity: float, diff_lines: list[str]
+) -> dict[str, Any]:
     changes = (
         response.get("changes", []) if isinstance(response.get("changes"), list) else []
     )
@@ -378,4 +590,33 @@ def compare_documents(
         "similarity": round(similarity, 4),
         "changes": normalized_changes[:30],
         "diff_preview": diff_lines[:220],
+        "model": _model_name(response),
     }
+
+
+async def compare_documents_async(
+    *,
+    left_name: str,
+    left_text: str,
+    right_name: str,
+    right_text: str,
+    ollama: OllamaClient,
+) -> dict[str, Any]:
+    if left_text == right_text:
+        # Re-uploads of the same content have nothing to diff or ask the model.
+        return {
+            "summary": "The documents have identical text.",
+            "similarity": 1.0,
+            "changes": [],
+            "diff_preview": [],
+            "model": "",
+        }
+    system_prompt, user_prompt = _comparison_prompts(
+        left_name, left_text, right_name, right_text
+    )
+    # The character-level diff is CPU-bound; run it while the model responds.
+    (similarity, diff_lines), response = await asyncio.gather(
+        asyncio.to_thread(_text_diff, left_name, left_text, right_name, right_text),
+        _ask_model_async(ollama, system_prompt=system_prompt, user_prompt=user_prompt),
+    )
+    return _build_comparison(response, similarity, diff_lines)
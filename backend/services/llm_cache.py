@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import functools
+import hashlib
+import json
+import re
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Any, Awaitable, Callable
+
+import orjson
+
+try:
+    from database import Database
+except ModuleNotFoundError:
+    from backend.database import Database
+
+
+Result = dict[str, Any]
+
+
+# The llm_cache table is pruned at startup and after this many new entries.
+PRUNE_EVERY_STORES = 256
+
+
+def cache_key(analysis_type: str, level: str, digest: str) -> str:
+    return f"{digest}:{analysis_type}:{level}"
+
+
+def text_digest(*parts: str | bytes) -> str:
+    hasher = hashlib.blake2b(digest_size=32)
+    for part in parts:
+        hasher.update(part.encode("utf-8") if isinstance(part, str) else part)
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _stringify_wide_ints(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value if -(2**63) <= value < 2**64 else str(value)
+    if isinstance(value, dict):
+        return {key: _stringify_wide_ints(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_stringify_wide_ints(item) for item in value]
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _stringify_wide_ints(dataclasses.asdict(value))
+    return value
+
+
+def encode_json(value: Any, *, option: int = 0) -> bytes:
+    try:
+        return orjson.dumps(value, option=option)
+    except TypeError:
+        # orjson rejects integers beyond 64 bits, which raw model output may
+        # contain; keep their digits exactly as strings.
+        return orjson.dumps(_stringify_wide_ints(value), option=option)
+
+
+# Any run of 20 digits might be an integer orjson would read as a float.
+_WIDE_INT_RE = re.compile(r"\d{20}")
+
+
+def decode_json(raw: str) -> Any:
+    # orjson validates; json re-parses the rare text with integers beyond 64
+    # bits so their digits survive. Raises orjson.JSONDecodeError.
+    value = orjson.loads(raw)
+    if _WIDE_INT_RE.search(raw):
+        return json.loads(raw)
+    return value
+
+
+# LRU of JSON-encoded results bounded by total encoded size; callers get a
+# fresh decode so cached values are never shared or mutated.
+class MemoryCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    def get(self, key: str) -> Result | None:
+        with self._lock:
+            raw = self._items.get(key)
+            if raw is None:
+                return None
+            self._items.move_to_end(key)
+        return orjson.loads(raw)
+
+    def put(self, key: str, value: Result) -> None:
+        raw = encode_json(value)
+        if len(raw) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._items[key] = raw
+            self._size += len(raw)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+# Exact digest + analysis type + level, in memory and persisted to the
+# llm_cache table. Results are only ever reused for identical input: a near
+# duplicate, such as the next version of a contract, needs its own answer.
+class LLMCache:
+    def __init__(
+        self,
+        db: Database,
+        *,
+        max_bytes: int,
+        max_entries: int,
+        ttl: timedelta,
+        version: str = "",
+    ) -> None:
+        self.db = db
+        # Folded into every level so entries produced by another model or
+        # prompt revision are never hit.
+        self.version = version
+        self.memory = MemoryCache(max_bytes)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._stores = 0
+        self._stores_lock = Lock()
+
+    def _cutoff(self) -> str:
+        return (datetime.now(timezone.utc) - self.ttl).isoformat()
+
+    def prune(self) -> None:
+        # Drops expired rows and rows from other model/prompt versions, which
+        # can never be hit again, then the oldest beyond max_entries.
+        def prune_rows(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ? OR level NOT LIKE ?",
+                (self._cutoff(), f"%@{self.version}"),
+            )
+            conn.execute(
+                """
+                DELETE FROM llm_cache
+                WHERE created_at <= (
+                    SELECT created_at FROM llm_cache
+                    ORDER BY created_at DESC
+                    LIMIT 1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+        self.db.write_batch(prune_rows)
+
+    def _versioned(self, level: str) -> str:
+        return f"{level}@{self.version}"
+
+    def _load(self, key: str) -> Result | None:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        row = self.db.fetch_one(
+            "SELECT result_json FROM llm_cache WHERE cache_key = ? AND created_at >= ?",
+            (key, self._cutoff()),
+        )
+        if row is None:
+            return None
+        try:
+            value = decode_json(row["result_json"])
+        except orjson.JSONDecodeError:
+            return None
+        self.memory.put(key, value)
+        return value
+
+    def _store(self, key: str, analysis_type: str, level: str, value: Result) -> None:
+        self.memory.put(key, value)
+        self.db.execute(
+            """
+            INSERT OR REPLACE INTO llm_cache(
+                cache_key, analysis_type, level, result_json, created_at
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                key,
+                analysis_type,
+                level,
+                encode_json(value).decode("utf-8"),
+                datetime.now(timezone.utc).isoformat(),
+            ),
+        )
+        with self._stores_lock:
+            self._stores += 1
+            due = self._stores % PRUNE_EVERY_STORES == 0
+        if due:
+            self.prune()
+
+    async def lookup(
+        self,
+        analysis_type: str,
+        level: str,
+        digest: str,
+        compute: Callable[[], Awaitable[Result]],
+        *,
+        cacheable: Callable[[Result], bool] = lambda _: True,
+    ) -> tuple[Result, bool]:
+        # Returns the result and whether it came from the cache.
+        level = self._versioned(level)
+        key = cache_key(analysis_type, level, digest)
+        value = await asyncio.to_thread(self._load, key)
+        if value is not None:
+            return value, True
+
+        value = await compute()
+        if cacheable(value):
+            await asyncio.to_thread(self._store, key, analysis_type, level, value)
+        return value, False
+
+    def cached(
+        self,
+        analysis_type: str,
+        *,
+        key_parts: Callable[[dict[str, Any]], tuple[str | bytes, ...]],
+        level: Callable[[dict[str, Any]], str] = lambda _: "default",
+        cacheable: Callable[[Result], bool] = lambda _: True,
+    ) -> Callable[
+        [Callable[..., Awaitable[Result]]],
+        Callable[..., Awaitable[tuple[Result, bool]]],
+    ]:
+        # Wrapped async functions return (result, served from cache). The key
+        # digests key_parts, which must cover everything the prompt is built
+        # from.
+        def decorator(
+            func: Callable[..., Awaitable[Result]],
+        ) -> Callable[..., Awaitable[tuple[Result, bool]]]:
+            @functools.wraps(func)
+            async def wrapper(**kwargs: Any) -> tuple[Result, bool]:
+                return await self.lookup(
+                    analysis_type,
+                    level(kwargs),
+                    text_digest(*key_parts(kwargs)),
+                    lambda: func(**kwargs),
+                    cacheable=cacheable,
+                )
+
+            return wrapper
+
+        return decorator
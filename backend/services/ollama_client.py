@@ -1,31 +1,124 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import contextlib
+import functools
 import json
+import threading
 from dataclasses import dataclass
 from typing import Any
 
 import httpx
 
+try:
+    import pybase64
+except Exception:  # pragma: no cover - optional dependency at runtime
+    pybase64 = None
+
+
+def _b64encode(data: bytes) -> str:
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("utf-8")
+
 
 @dataclass
 class OllamaConfig:
     base_url: str
     model: str
     vision_model: str = ""
+    # Sent with every chat so the server keeps the model and its prompt cache
+    # loaded between requests; num_ctx must stay constant or Ollama reloads.
+    keep_alive: str = "30m"
+    num_ctx: int = 0
+
+
+class _StreamedReply:
+    # Collects streamed /api/chat deltas. In JSON mode reading stops as soon
+    # as the content parses as a complete object, so trailing whitespace the
+    # model keeps emitting is never waited for; closing the stream early also
+    # lets Ollama cancel the rest of the generation.
+    def __init__(self, stop_at_json: bool) -> None:
+        self.stop_at_json = stop_at_json
+        self.model = ""
+        self.parts: list[str] = []
+
+    def feed(self, line: str) -> bool:
+        if not line.strip():
+            return False
+        chunk = json.loads(line)
+        if chunk.get("error"):
+            raise RuntimeError(chunk["error"])
+        self.model = chunk.get("model", self.model)
+        delta = chunk.get("message", {}).get("content", "")
+        self.parts.append(delta)
+        if chunk.get("done"):
+            return True
+        return self.stop_at_json and "}" in delta and self._holds_object()
+
+    def _holds_object(self) -> bool:
+        try:
+            return isinstance(json.loads("".join(self.parts)), dict)
+        except json.JSONDecodeError:
+            return False
+
+    def response(self) -> dict[str, Any]:
+        return {
+            "model": self.model,
+            "message": {"role": "assistant", "content": "".join(self.parts)},
+        }
 
 
 class OllamaClient:
     def __init__(self, config: OllamaConfig, timeout_seconds: float = 120.0) -> None:
         self.config = config
         self.timeout_seconds = timeout_seconds
+        # Shared pools keep connections to Ollama alive across requests. Both
+        # are created on first use so the client works again after aclose().
+        self._client: httpx.Client | None = None
+        self._client_lock = threading.Lock()
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_client(self) -> httpx.Client:
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout_seconds)
+            return self._client
+
+    async def _get_async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's pool belongs to the loop it first ran on, so a new
+        # loop (a fresh test client, say) gets a fresh client.
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_loop is not loop:
+            stale, self._async_client = self._async_client, None
+            # Closes the sockets; the old loop may already be closed, which
+            # only fails the final transport callbacks.
+            with contextlib.suppress(RuntimeError):
+                await stale.aclose()
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout_seconds)
+            self._async_loop = loop
+        return self._async_client
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
 
     def health(self) -> dict[str, Any]:
         try:
-            with httpx.Client(timeout=8.0) as client:
-                response = client.get(f"{self.config.base_url}/api/tags")
-                response.raise_for_status()
-                payload = response.json()
+            response = self._get_client().get(
+                f"{self.config.base_url}/api/tags", timeout=8.0
+            )
+            response.raise_for_status()
+            payload = response.json()
         except Exception as exc:  # pragma: no cover - depends on local Ollama runtime
             return {
                 "available": False,
@@ -43,11 +136,22 @@ class OllamaClient:
             "installed_models": model_names,
         }
 
+    def _chat_options(self, temperature: float) -> dict[str, Any]:
+        options: dict[str, Any] = {"temperature": temperature}
+        if self.config.num_ctx:
+            options["num_ctx"] = self.config.num_ctx
+        return options
+
     def _chat(self, payload: dict[str, Any]) -> dict[str, Any]:
-        with httpx.Client(timeout=self.timeout_seconds) as client:
-            response = client.post(f"{self.config.base_url}/api/chat", json=payload)
+        reply = _StreamedReply(stop_at_json=payload.get("format") == "json")
+        with self._get_client().stream(
+            "POST", f"{self.config.base_url}/api/chat", json=payload
+        ) as response:
             response.raise_for_status()
-            return response.json()
+            for line in response.iter_lines():
+                if reply.feed(line):
+                    break
+        return reply.response()
 
     @staticmethod
     def _parse_json_content(content: str) -> dict[str, Any]:
@@ -64,38 +168,90 @@ class OllamaClient:
             pass
         return {"raw": content}
 
-    def chat_json(
+    async def _chat_async(self, payload: dict[str, Any]) -> dict[str, Any]:
+        reply = _StreamedReply(stop_at_json=payload.get("format") == "json")
+        client = await self._get_async_client()
+        async with client.stream(
+            "POST", f"{self.config.base_url}/api/chat", json=payload
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if reply.feed(line):
+                    break
+        return reply.response()
+
+    def _json_payload(
         self,
         *,
         system_prompt: str,
         user_prompt: str,
-        model: str | None = None,
-        temperature: float = 0.1,
-        images: list[bytes] | None = None,
+        model: str | None,
+        temperature: float,
+        images: list[bytes] | None,
     ) -> dict[str, Any]:
         selected_model = model or self.config.model
         messages: list[dict[str, Any]] = [{"role": "system", "content": system_prompt}]
         user_message: dict[str, Any] = {"role": "user", "content": user_prompt}
         if images:
-            user_message["images"] = [
-                base64.b64encode(item).decode("utf-8") for item in images
-            ]
+            user_message["images"] = [_b64encode(item) for item in images]
         messages.append(user_message)
 
-        payload = {
+        return {
             "model": selected_model,
             "messages": messages,
-            "stream": False,
+            "stream": True,
             "format": "json",
-            "options": {"temperature": temperature},
+            "keep_alive": self.config.keep_alive,
+            "options": self._chat_options(temperature),
         }
 
-        response = self._chat(payload)
+    def _json_result(self, response: dict[str, Any], model: str) -> dict[str, Any]:
         content = response.get("message", {}).get("content", "")
         parsed = self._parse_json_content(content)
-        parsed.setdefault("_model", selected_model)
+        parsed.setdefault("_model", model)
         return parsed
 
+    def chat_json(
+        self,
+        *,
+        system_prompt: str,
+        user_prompt: str,
+        model: str | None = None,
+        temperature: float = 0.1,
+        images: list[bytes] | None = None,
+    ) -> dict[str, Any]:
+        payload = self._json_payload(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model=model,
+            temperature=temperature,
+            images=images,
+        )
+        response = self._chat(payload)
+        return self._json_result(response, payload["model"])
+
+    async def chat_json_async(
+        self,
+        *,
+        system_prompt: str,
+        user_prompt: str,
+        model: str | None = None,
+        temperature: float = 0.1,
+        images: list[bytes] | None = None,
+    ) -> dict[str, Any]:
+        build = functools.partial(
+            self._json_payload,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model=model,
+            temperature=temperature,
+            images=images,
+        )
+        # Base64-encoding attachments is CPU work; keep it off the event loop.
+        payload = await asyncio.to_thread(build) if images else build()
+        response = await self._chat_async(payload)
+        return self._json_result(response, payload["model"])
+
     def chat_text(
         self,
         *,
@@ -111,8 +267,9 @@ class OllamaClient:
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
-            "stream": False,
-            "options": {"temperature": temperature},
+            "stream": True,
+            "keep_alive": self.config.keep_alive,
+            "options": self._chat_options(temperature),
         }
         response = self._chat(payload)
         return response.get("message", {}).get("content", "").strip()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import errno
+import os
+import sys
+import threading
+from functools import cache
+from pathlib import Path
+from typing import AsyncIterable
+
+try:
+    import liburing
+except Exception:  # pragma: no cover - optional dependency at runtime
+    liburing = None
+
+RING_ENTRIES = 32
+# Writes are queued and submitted together; the final batch is linked with
+# fdatasync + close so small uploads cost a single io_uring_enter().
+WRITE_BATCH = 4
+
+_local = threading.local()
+
+
+def _ring() -> "liburing.Ring":
+    # One ring per worker thread: rings are not safe to share without a lock
+    # and each submission waits for its own completions.
+    ring = getattr(_local, "ring", None)
+    if ring is None:
+        ring = liburing.Ring()
+        liburing.io_uring_queue_init(RING_ENTRIES, ring)
+        _local.ring = ring
+    return ring
+
+
+@cache
+def uring_available() -> bool:
+    if sys.platform != "linux" or liburing is None:
+        return False
+    try:
+        ring = liburing.Ring()
+        liburing.io_uring_queue_init(2, ring)
+        liburing.io_uring_queue_exit(ring)
+    except Exception:
+        return False
+    return True
+
+
+def _submit_linked(fd: int, offset: int, chunks: list[bytes], finish: bool) -> int:
+    ring = _ring()
+    expected: list[int | None] = []
+    for chunk in chunks:
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_write(sqe, fd, chunk, offset)
+        sqe.flags |= liburing.IOSQE_IO_LINK
+        expected.append(len(chunk))
+        offset += len(chunk)
+    if finish:
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_fsync(sqe, fd, liburing.IORING_FSYNC_DATASYNC)
+        sqe.flags |= liburing.IOSQE_IO_LINK
+        expected.append(None)
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_close(sqe, fd)
+        expected.append(None)
+    elif expected:
+        sqe.flags &= ~liburing.IOSQE_IO_LINK
+
+    liburing.io_uring_submit_and_wait(ring, len(expected))
+    cqe = liburing.Cqe()
+    results: list[int] = []
+    for _ in expected:
+        liburing.io_uring_wait_cqe(ring, cqe)
+        results.append(cqe[0].res)
+        liburing.io_uring_cqe_seen(ring, cqe[0])
+
+    if finish and results[-1] == -errno.ECANCELED:
+        # An earlier link failed, so the kernel never ran the close.
+        _close_quietly(fd)
+    for res, size in zip(results, expected):
+        liburing.trap_error(res)
+        if size is not None and res != size:
+            raise OSError(f"Short write to upload file ({res} of {size} bytes).")
+    return offset
+
+
+def _close_quietly(fd: int) -> None:
+    try:
+        os.close(fd)
+    except OSError:
+        pass
+
+
+async def write_and_sync(path: Path, chunks: AsyncIterable[bytes]) -> None:
+    """Write chunks to path via io_uring, then fdatasync and close it."""
+    fd = await asyncio.to_thread(
+        os.open, path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o644
+    )
+    offset = 0
+    pending: list[bytes] = []
+    try:
+        async for chunk in chunks:
+            pending.append(chunk)
+            if len(pending) >= WRITE_BATCH:
+                offset = await asyncio.to_thread(
+                    _submit_linked, fd, offset, pending, False
+                )
+                pending = []
+    except BaseException:
+        _close_quietly(fd)
+        raise
+    # From here the ring owns the descriptor and closes it.
+    await asyncio.to_thread(_submit_linked, fd, offset, pending, True)
@@ -0,0 +1,41 @@
+import re
+
+import pytest
+
+from backend.services.intelligence import _FALLBACK_PATTERN_SOURCES, fallback_entities
+
+
+def baseline_entities(text: str) -> list[tuple[str, str, int, int]]:
+    # The original extractor: one stdlib re pass per pattern, deduplicated
+    # per type on the lowercased value.
+    output = []
+    for entity_type, pattern in _FALLBACK_PATTERN_SOURCES.items():
+        seen = set()
+        for match in re.finditer(pattern, text):
+            value = match.group().strip()
+            if len(value) < 3 or value.lower() in seen:
+                continue
+            seen.add(value.lower())
+            output.append((entity_type, value, match.start(), match.end()))
+    return output
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Total due:\xa0$\xa0450.00 USD\xa0$300. Call 555\xa0123\xa04567.",
+        "Text me at 5551234567@sms.carrier.com",
+        "Wire $5551234567 to Acme Holdings Inc by 03/04/2024.",
+        "Jane Doe of Northwind Traders LLC lives at 12 Elm Street, Springfield.",
+        "Thin space 555 123 4567 and ideographic　$　12.50",
+        "Arabic-Indic digits ٥٥٥-١٢٣-٤٥٦٧",
+        "Separator controls 555\x1c123\x1f4567",
+        "ÉLan Martin emailed jane.doe@example.org on Jan 5, 2024.",
+    ],
+)
+def test_fallback_entities_match_baseline(text: str) -> None:
+    found = [
+        (entity.entity_type, entity.value, entity.start_index, entity.end_index)
+        for entity in fallback_entities(text)
+    ]
+    assert found == baseline_entities(text)
@@ -0,0 +1,52 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.services import document_parser
+from backend.services.document_parser import _ocr_image, extract_text_from_image
+
+
+def write_transparent_text_png(path: Path, mode: str = "RGBA") -> None:
+    # Dark text on fully transparent black, as exported by most design tools.
+    image = Image.new("RGBA", (900, 200), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.text((30, 50), "INVOICE 4821", fill=(20, 20, 20, 255), font=_font())
+    if mode == "P":
+        image = image.convert("P", palette=Image.ADAPTIVE)
+        image.info["transparency"] = image.getpixel((0, 0))
+    elif mode == "LA":
+        image = image.convert("LA")
+    image.save(path)
+
+
+def _font() -> ImageFont.ImageFont:
+    try:
+        return ImageFont.load_default(size=72)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "LA", "P"])
+def test_transparent_background_becomes_white(tmp_path: Path, mode: str) -> None:
+    path = tmp_path / "text.png"
+    write_transparent_text_png(path, mode)
+
+    image = _ocr_image(path)
+
+    assert image.mode == "L"
+    assert image.getpixel((0, 0)) == 255
+    low, high = image.getextrema()
+    assert low < 128 < high
+
+
+@pytest.mark.skipif(
+    document_parser.pytesseract is None or shutil.which("tesseract") is None,
+    reason="tesseract is not installed",
+)
+def test_ocr_reads_text_on_transparent_png(tmp_path: Path) -> None:
+    path = tmp_path / "text.png"
+    write_transparent_text_png(path)
+
+    assert "4821" in extract_text_from_image(path)